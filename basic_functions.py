@@ -1,5 +1,9 @@
 from datetime import time
 
+import numpy
+
+from constants import *
+
 
 def time_to_sec(t):
     sec = (t.hour * 60 + t.minute) * 60 + t.second
@@ -8,6 +12,7 @@ def time_to_sec(t):
 
 
 def sec_to_time(s):
+    s = s % DAY_SECONDS
     return time(
         hour=(int(s // 3600)),
         minute=(int((s % 3600) // 60)),
@@ -15,21 +20,50 @@ def sec_to_time(s):
         microsecond=int((s - int(s)) * 1000000))
 
 
-def formate_time(t):
-    return t.strftime("%H:%M:%S.") + f"{t.microsecond // 10000:02d}"
+def unwrap_day_times(times, previous_s=None):
+    # Clock times are logged without a date, so a backward jump of more than half a day is taken as midnight.
+    times = numpy.asarray(times, dtype=float)
+    if not len(times):
+        return times
+    if previous_s is None:
+        previous_s = times[0]
+    previous_day, previous_time = divmod(previous_s, DAY_SECONDS)
+    steps = numpy.diff(times, prepend=previous_time)
+    days = previous_day + numpy.cumsum(steps < -DAY_SECONDS / 2) - numpy.cumsum(steps > DAY_SECONDS / 2)
+    return times + days * DAY_SECONDS
+
+
+def unwrap_interval_times(froms_s, tos_s, previous_s=None):
+    times = unwrap_day_times(numpy.column_stack((froms_s, tos_s)).ravel(), previous_s)
+    return times[0::2], times[1::2]
 
 
-def custom_max(n1, n2):
-    if n1 is None:
-        return n2
-    if n2 is None:
-        return n1
-    return max(n1, n2)
+def place_day_times(times, reference_s):
+    # Each time of day is moved to the day that puts it nearest to reference_s.
+    days = numpy.round((reference_s - numpy.asarray(times)) / DAY_SECONDS).astype(numpy.int64)
+    return numpy.sort(times + days * DAY_SECONDS)
+
+
+def spread_duplicate_times(times):
+    # Samples logged within one clock tick share a timestamp, so they are spread evenly over that tick.
+    times = numpy.asarray(times, dtype=float)
+    run_starts = numpy.flatnonzero(numpy.diff(times, prepend=numpy.nan) != 0)
+    run_lengths = numpy.diff(numpy.append(run_starts, len(times)))
+    if (run_lengths <= 1).all():
+        return times
+    ticks = numpy.append(times[run_starts[1:]], numpy.inf) - times[run_starts]
+    ticks = numpy.where(ticks > 0, numpy.minimum(ticks, 1), 1)
+    runs = numpy.repeat(numpy.arange(len(run_starts)), run_lengths)
+    positions = numpy.arange(len(times)) - run_starts[runs]
+    return times + positions * (ticks / run_lengths)[runs]
+
+
+def formate_time(t):
+    return t.strftime("%H:%M:%S.") + f"{t.microsecond // 10000:02d}"
 
 
-def custom_min(n1, n2):
-    if n1 is None:
-        return n2
-    if n2 is None:
-        return n1
-    return min(n1, n2)
+def find_nearest_index(sorted_values, values):
+    idx = numpy.searchsorted(sorted_values, values)
+    lower = numpy.maximum(idx - 1, 0)
+    upper = numpy.minimum(idx, len(sorted_values) - 1)
+    return numpy.where(values - sorted_values[lower] <= sorted_values[upper] - values, lower, upper)
@@ -0,0 +1,117 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
+
+from constants import *
+from session_dir import MainDirClass, find_session_dirs
+from data_processing import DataClass
+from heart_rate import HeartRateBaseline
+from event_response import sample_session_events, pool_event_windows, get_event_offsets
+from table_export import get_table_writer
+
+EXPORT_TABLES = {"fixations": None, "objects": "object", "tags": "tag"}
+EXPORT_RESPONSES = {"object_responses": "object", "tag_responses": "tag"}
+EXPORT_FORMATS = ("csv", "npz")
+
+
+def get_session_name(session_dir, root):
+    return os.path.relpath(session_dir, root).replace(os.sep, "_")
+
+
+def export_session(data, output_dir, file_format, event_response=False, rolling_window=None):
+    os.makedirs(output_dir, exist_ok=True)
+    write_table = get_table_writer(file_format)
+    for table, group_by in EXPORT_TABLES.items():
+        table_data = data.object_data if group_by is None else data.get_aggregated_data(group_by)
+        write_table(os.path.join(output_dir, f"{table}.{file_format}"), table_data)
+    if rolling_window is not None:
+        rolling = data.hr_series.get_rolling_table(rolling_window)
+        write_table(os.path.join(output_dir, f"hr_rolling.{file_format}"), rolling)
+    if event_response:
+        session_events = {group_by: sample_session_events(data, group_by, get_event_offsets())
+                          for group_by in EXPORT_RESPONSES.values()}
+        export_event_responses([session_events], output_dir, file_format)
+        return session_events
+    return None
+
+
+def export_event_responses(session_events, output_dir, file_format):
+    # Each session gives the windows it sampled per group_by, so pooling several sessions loads none of them again.
+    write_table = get_table_writer(file_format)
+    for table, group_by in EXPORT_RESPONSES.items():
+        response = pool_event_windows([events[group_by] for events in session_events], get_event_offsets())
+        write_table(os.path.join(output_dir, f"{table}.{file_format}"), response)
+
+
+def process_session(session_dir, output_dir, file_format, use_cache, baseline_method=None, event_response=False,
+                    rolling_window=None):
+    start = perf_counter()
+    main_dir = MainDirClass.from_path(session_dir)
+    try:
+        data = DataClass(main_dir, use_cache=use_cache)
+        if baseline_method is not None:
+            data.set_hr_baseline_method(baseline_method)
+        load_time = perf_counter() - start
+        events = export_session(data, output_dir, file_format, event_response, rolling_window)
+    except Exception as error:
+        return session_dir, None, perf_counter() - start, f"{type(error).__name__}: {error}", None
+    return session_dir, load_time, perf_counter() - start, len(data.object_data), events
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process eye-tracking sessions without the GUI and export their tables.")
+    parser.add_argument("paths", nargs="+", help="session folders or folders searched for sessions")
+    parser.add_argument("-o", "--output-dir", default="output", help="one sub-folder is written per session")
+    parser.add_argument("-f", "--format", choices=EXPORT_FORMATS, default="csv")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--no-cache", action="store_true", help="neither read nor write the session cache")
+    parser.add_argument("--baseline", choices=HR_BASELINE_METHODS, default=HR_BASELINE_METHODS[0],
+                        help="HR that ΔHR is measured against")
+    parser.add_argument("--baseline-window", type=float, help="seconds of HR the preceding or calibration baseline uses")
+    parser.add_argument("--event-response", action="store_true",
+                        help="also export the HR around fixation onsets per object and tag, per session and pooled")
+    parser.add_argument("--rolling-window", type=float,
+                        help="also export the rolling mean and slope of the HR over this many seconds")
+    args = parser.parse_args()
+    if args.baseline_window is not None and args.baseline not in HR_BASELINE_WINDOWS:
+        parser.error(f"--baseline-window has no effect with --baseline {args.baseline}")
+    baseline_method = HeartRateBaseline(args.baseline, args.baseline_window)
+
+    session_dirs = find_session_dirs(args.paths)
+    if not session_dirs:
+        print("No session folders found.")
+        return 1
+    root = os.path.commonpath([os.path.abspath(path) for path in session_dirs])
+    if len(session_dirs) == 1:
+        root = os.path.dirname(root)
+
+    start = perf_counter()
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = list()
+        for session_dir in session_dirs:
+            output_dir = os.path.join(args.output_dir, get_session_name(os.path.abspath(session_dir), root))
+            futures.append(executor.submit(process_session, session_dir, output_dir, args.format, not args.no_cache,
+                                           baseline_method, args.event_response, args.rolling_window))
+        session_events = dict()
+        for future in as_completed(futures):
+            session_dir, load_time, total_time, result, events = future.result()
+            session_events[session_dir] = events
+            if load_time is None:
+                failed += 1
+                print(f"{session_dir}: failed after {total_time:.2f} s ({result})")
+            else:
+                print(f"{session_dir}: {result} fixations, loaded in {load_time:.2f} s, total {total_time:.2f} s")
+
+    if args.event_response and not failed and len(session_dirs) > 1:
+        pooled_dir = os.path.join(args.output_dir, "pooled")
+        os.makedirs(pooled_dir, exist_ok=True)
+        export_event_responses([session_events[session_dir] for session_dir in session_dirs], pooled_dir, args.format)
+        print(f"Pooled HR responses written to '{pooled_dir}'")
+    print(f"Processed {len(session_dirs) - failed}/{len(session_dirs)} sessions in {perf_counter() - start:.2f} s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
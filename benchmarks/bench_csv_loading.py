@@ -0,0 +1,93 @@
+import argparse
+import os
+import tempfile
+from datetime import datetime
+from time import perf_counter
+
+from constants import *
+from csv_loader import *
+from benchmarks.synthetic_session import write_text_file, write_heart_rate_file
+
+
+def write_synthetic_files(directory, rows, seed=0):
+    text_path = os.path.join(directory, "data.csv")
+    hr_path = os.path.join(directory, "hr_data.csv")
+    end_s = write_text_file(text_path, rows, seed=seed)
+    write_heart_rate_file(hr_path, 0, int(end_s), seed=seed)
+    return text_path, hr_path
+
+
+def legacy_load_text_data(path):
+    data = list()
+    with open(path, 'r') as file:
+        file.readline()
+        for line in file:
+            record = line.strip().split(DELIMITER)
+            if len(record) == DATA_COLUMN_COUNT:
+                obj, tag = record[0], record[1]
+                try:
+                    from_t = datetime.strptime(record[2], TIME_FORMAT_EYETRACKING)
+                    to_t = datetime.strptime(record[3], TIME_FORMAT_EYETRACKING)
+                except ValueError:
+                    continue
+                data.append(tuple([obj, tag, from_t.time(), to_t.time()]))
+    return data
+
+
+def legacy_load_heart_rate_data(path):
+    data = dict()
+    with open(path, 'r') as file:
+        file.readline()
+        for line in file:
+            record = line.strip().split(DELIMITER)
+            if len(record) != HR_DATA_COLUMN_COUNT:
+                continue
+            real_time_string, therapy_time_string, hr = record
+            try:
+                real_time = datetime.strptime(real_time_string, TIME_FORMAT_HR).time()
+            except ValueError:
+                real_time = datetime.min.time()
+            data[real_time] = int(hr) if hr.isdigit() else None
+    return data
+
+
+def measure(function, *args):
+    start = perf_counter()
+    result = function(*args)
+    return perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the line-by-line and columnar CSV loaders.")
+    parser.add_argument("--rows", type=int, default=2_000_000, help="eye-tracking rows in the synthetic data.csv")
+    parser.add_argument("--chunk-size", type=int, default=CSV_CHUNK_SIZE, help="columnar loader chunk size in bytes")
+    parser.add_argument("--skip-legacy", action="store_true", help="time only the columnar loader")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"Writing {args.rows} synthetic rows...")
+        text_path, hr_path = write_synthetic_files(directory, args.rows)
+        print(f"data.csv: {os.path.getsize(text_path) / 1e6:.1f} MB, hr_data.csv: {os.path.getsize(hr_path) / 1e6:.1f} MB")
+
+        results = list()
+        bulk_time, text_columns = measure(load_text_columns, text_path, None)
+        results.append(("data.csv columnar (bulk)", bulk_time, len(text_columns)))
+        chunked_time, text_columns = measure(load_text_columns, text_path, args.chunk_size)
+        results.append(("data.csv columnar (chunked)", chunked_time, len(text_columns)))
+        hr_time, hr_columns = measure(load_heart_rate_columns, hr_path, args.chunk_size)
+        results.append(("hr_data.csv columnar (chunked)", hr_time, len(hr_columns)))
+        if not args.skip_legacy:
+            legacy_time, legacy_text = measure(legacy_load_text_data, text_path)
+            results.append(("data.csv legacy", legacy_time, len(legacy_text)))
+            legacy_hr_time, legacy_hr = measure(legacy_load_heart_rate_data, hr_path)
+            results.append(("hr_data.csv legacy", legacy_hr_time, len(legacy_hr)))
+
+        for name, seconds, rows in results:
+            print(f"{name:32} {seconds:8.3f} s {rows:10} rows")
+        print(f"Skipped rows: data.csv {text_columns.skipped}, hr_data.csv {hr_columns.skipped}")
+        if not args.skip_legacy:
+            print(f"Speed-up (data.csv, chunked): {legacy_time / chunked_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
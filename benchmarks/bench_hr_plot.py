@@ -0,0 +1,74 @@
+import argparse
+import os
+from time import perf_counter
+
+import numpy
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pyqtgraph
+from PyQt6.QtWidgets import QApplication
+
+from decimation import MinMaxPyramid
+
+SPANS = (("24 h", 24 * 3600), ("6 h", 6 * 3600), ("1 h", 3600), ("10 min", 600), ("1 min", 60))
+
+
+def create_synthetic_series(rate, hours=24, seed=0):
+    rng = numpy.random.default_rng(seed)
+    xs = numpy.arange(0, hours * 3600, 1 / rate)
+    ys = 80 + 15 * numpy.sin(xs / 900) + numpy.cumsum(rng.normal(0, 0.05, len(xs)))
+    ys = numpy.round(ys)
+    for start in rng.integers(0, len(xs), 50):
+        ys[start:start + int(rng.integers(rate, 120 * rate))] = numpy.nan
+    return xs, ys
+
+
+def time_redraw(widget, curve, get_points, x_from, x_to, repeats):
+    timings = list()
+    for _ in range(repeats):
+        start = perf_counter()
+        xs, ys = get_points(x_from, x_to)
+        curve.setData(xs, ys, connect="finite")
+        widget.setXRange(x_from, x_to, padding=0)
+        widget.grab()
+        timings.append(perf_counter() - start)
+    return 1000 * numpy.median(timings), len(xs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Redraw times of the HR plot with and without the min/max pyramid.")
+    parser.add_argument("--rate", type=float, default=10, help="HR samples per second in the synthetic 24-hour series")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--width", type=int, default=1200, help="plot width in pixels")
+    args = parser.parse_args()
+
+    app = QApplication([])
+    widget = pyqtgraph.PlotWidget()
+    widget.resize(args.width, 400)
+    widget.show()
+    curve = widget.plot(pen=pyqtgraph.mkPen(color="#007CBE", width=3))
+    app.processEvents()
+
+    xs, ys = create_synthetic_series(args.rate)
+    start = perf_counter()
+    pyramid = MinMaxPyramid(xs, ys)
+    print(f"{len(xs)} samples, pyramid built in {1000 * (perf_counter() - start):.1f} ms")
+
+    def get_raw_points(x_from, x_to):
+        return xs, ys
+
+    def get_lod_points(x_from, x_to):
+        return pyramid.get_points(x_from, x_to, int(widget.getViewBox().width()))
+
+    print(f"{'span':8} {'raw ms':>10} {'raw pts':>10} {'lod ms':>10} {'lod pts':>10}")
+    for name, span in SPANS:
+        x_from = xs[len(xs) // 2] - span / 2
+        x_to = x_from + span
+        raw_ms, raw_points = time_redraw(widget, curve, get_raw_points, x_from, x_to, args.repeats)
+        lod_ms, lod_points = time_redraw(widget, curve, get_lod_points, x_from, x_to, args.repeats)
+        print(f"{name:8} {raw_ms:10.1f} {raw_points:10} {lod_ms:10.1f} {lod_points:10}")
+
+
+if __name__ == "__main__":
+    main()
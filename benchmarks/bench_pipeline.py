@@ -0,0 +1,178 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from time import perf_counter
+
+import numpy
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication
+
+from constants import *
+from session_dir import MainDirClass
+from data_processing import DataClass
+from table_tab import TableTab
+from benchmarks.synthetic_session import write_session
+
+STAGE_NAMES = ("load_heart_rate_data", "load_text_data", "scan_images", "remove_noise", "create_object_data")
+RESULT_FORMAT_VERSION = 1
+
+
+class Measurement:
+    # Peak memory is the most the traced allocations grew above their level at the start.
+    def __init__(self):
+        self.tracing = tracemalloc.is_tracing()
+        if self.tracing:
+            tracemalloc.reset_peak()
+            self.base_bytes = tracemalloc.get_traced_memory()[0]
+        self.start = perf_counter()
+
+    def finish(self):
+        seconds = perf_counter() - self.start
+        return seconds, tracemalloc.get_traced_memory()[1] - self.base_bytes if self.tracing else None
+
+
+class StageTimer:
+    # Follows DataClass.build through its report_stage callback, so the stages run exactly as in the viewer.
+    def __init__(self):
+        self.stage = None
+        self.measurement = None
+        self.results = dict()
+
+    def report_stage(self, stage, fraction=0.0):
+        if stage != self.stage:
+            self.finish()
+            self.stage = stage
+            self.measurement = Measurement()
+
+    def finish(self):
+        if self.stage is not None:
+            self.results[STAGE_NAMES[self.stage]] = self.measurement.finish()
+        self.stage = None
+
+
+def measure(function, *args):
+    measurement = Measurement()
+    function(*args)
+    return measurement.finish()
+
+
+def run_once(main_dir, lookups, rng, trace_memory):
+    timer = StageTimer()
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        data = DataClass(main_dir, use_cache=False, report_stage=timer.report_stage)
+        timer.finish()
+        results = dict(timer.results)
+
+        times = rng.uniform(0, data.hr_series.times[-1], lookups).tolist()
+        results["get_object_at_time"] = measure(lambda: [data.get_object_at_time(t) for t in times])
+
+        table_tab = TableTab(data, main_dir)
+        for filter_id, filter_name in enumerate(table_tab.filter_options):
+            # Aggregates are cached per session, so each filter is timed from a cold cache.
+            data.aggregated_data = dict()
+            table_tab.filter_dropdown.setCurrentIndex(filter_id)
+            results[f"apply_filter ({filter_name})"] = measure(table_tab.apply_filter)
+        table_tab.deleteLater()
+
+        DataClass(main_dir)
+        results["cached load"] = measure(DataClass, main_dir)
+    finally:
+        tracemalloc.stop()
+    return results
+
+
+def get_version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def get_peak_rss_bytes():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def compare_results(results, baseline, threshold):
+    print(f"\n{'compared with ' + baseline['version']:40} {'ratio':>8}")
+    regressions = 0
+    for name, result in results["stages"].items():
+        previous = baseline["stages"].get(name)
+        if previous is None or not previous["seconds"]:
+            continue
+        ratio = result["seconds"] / previous["seconds"]
+        flag = " slower" if ratio > threshold else ""
+        regressions += bool(flag)
+        print(f"{name:40} {ratio:8.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each stage of the session pipeline on a synthetic session.")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="eye-tracking rows in the synthetic data.csv")
+    parser.add_argument("--hr-rate", type=int, default=1, help="heart rate samples per second")
+    parser.add_argument("--image-interval", type=int, default=2, help="seconds between screenshots")
+    parser.add_argument("--session", help="benchmark an existing session folder instead of a synthetic one")
+    parser.add_argument("--lookups", type=int, default=10_000, help="get_object_at_time calls")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slow-down ratio reported as a regression")
+    args = parser.parse_args()
+
+    app = QApplication([])
+    with tempfile.TemporaryDirectory() as directory:
+        if args.session is None:
+            print(f"Writing a synthetic session with {args.rows} rows...")
+            session = write_session(directory, args.rows, args.hr_rate, args.image_interval)
+            main_dir = MainDirClass.from_path(directory)
+        else:
+            main_dir = MainDirClass.from_path(args.session)
+            session = {"path": os.path.abspath(args.session)}
+
+        # Tracing allocations slows Python code down, so memory is measured in a separate run.
+        rng = numpy.random.default_rng(0)
+        runs = [run_once(main_dir, args.lookups, rng, False) for _ in range(args.repeats)]
+        memory_run = run_once(main_dir, args.lookups, rng, True)
+
+    stages = {name: {"seconds": float(numpy.median([run[name][0] for run in runs])),
+                     "peak_bytes": memory_run[name][1]} for name in memory_run}
+    results = {"format": RESULT_FORMAT_VERSION, "version": get_version(), "python": platform.python_version(),
+               "numpy": numpy.__version__, "platform": platform.platform(), "repeats": args.repeats,
+               "session": session, "stages": stages, "peak_rss_bytes": get_peak_rss_bytes()}
+
+    print(f"{'stage':40} {'median s':>10} {'+peak MB':>10}")
+    for name, result in stages.items():
+        print(f"{name:40} {result['seconds']:10.4f} {result['peak_bytes'] / 1e6:10.1f}")
+    if results["peak_rss_bytes"] is not None:
+        print(f"Peak RSS: {results['peak_rss_bytes'] / 1e6:.1f} MB")
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            if compare_results(results, json.load(file), args.threshold):
+                sys.exit(1)
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import os
+import random
+
+from PyQt6.QtCore import QBuffer, QByteArray, QIODevice
+from PyQt6.QtGui import QImage
+
+from constants import *
+from image_index import get_image_name
+
+OBJECT_NAMES = [("Sky", "sky"), ("Tree1 (trunk)", "tree trunk"), ("Tree2 (crown)", "tree crown"),
+                ("Cube1", "cube"), ("Cube2", "cube"), ("Deer", "animal"), ("Bench", "city")]
+FIXATION_DURATIONS = (0.01, 0.05, 0.2, 0.7, 1.5)
+
+
+def format_clock(s, fraction):
+    hours, minutes, seconds = int(s // 3600) % 24, int(s % 3600 // 60), int(s % 60)
+    text = f"{hours:02}:{minutes:02}:{seconds:02}"
+    if fraction:
+        text += f".{int(s * 100) % 100:02}"
+    return text
+
+
+def write_text_file(path, rows, start_s=0.0, seed=0, broken_every=10000):
+    rng = random.Random(seed)
+    t = start_s
+    with open(path, 'w') as file:
+        file.write("Object Name,Object Tag,Start Time,End Time\n")
+        for i in range(rows):
+            obj, tag = rng.choice(OBJECT_NAMES)
+            duration = rng.choice(FIXATION_DURATIONS)
+            if broken_every and i % broken_every == broken_every - 1:
+                file.write(f"{obj},{tag},broken\n")
+            else:
+                file.write(f"{obj},{tag},{format_clock(t, True)},{format_clock(t + duration, True)}\n")
+            t += duration
+    return t
+
+
+def write_heart_rate_file(path, start_s, end_s, rate=1, seed=0, missing_every=500):
+    rng = random.Random(seed)
+    samples = int((end_s - start_s) * rate) + 1
+    with open(path, 'w') as file:
+        file.write("Current Time,Therapy Time,HeartRate\n")
+        for i in range(samples):
+            hr = "N/A" if missing_every and i % missing_every == 0 else str(rng.randint(60, 120))
+            file.write(f"{format_clock(start_s + i / rate, rate > 1)},{format_clock(i / rate, False)},{hr}\n")
+    return samples
+
+
+def create_jpeg(width, height):
+    image = QImage(width, height, QImage.Format.Format_RGB32)
+    image.fill(0x4A7A3C)
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    image.save(buffer, "JPEG")
+    return bytes(data)
+
+
+def write_images(directory, start_s, end_s, interval=2, size=(617, 685)):
+    os.makedirs(directory, exist_ok=True)
+    jpeg = create_jpeg(*size)
+    # Names only carry the time of day, so at most one day of screenshots fits in a folder.
+    capture_times = range(int(start_s), int(min(end_s, start_s + DAY_SECONDS - 1)) + 1, interval)
+    for capture_time in capture_times:
+        with open(os.path.join(directory, f"{get_image_name(capture_time)}{FILE_EXTENSION}"), 'wb') as file:
+            file.write(jpeg)
+    return len(capture_times)
+
+
+def write_session(directory, rows, hr_rate=1, image_interval=2, image_size=(617, 685), start_s=10 * 3600, seed=0):
+    os.makedirs(directory, exist_ok=True)
+    end_s = write_text_file(os.path.join(directory, "data.csv"), rows, start_s, seed)
+    hr_samples = write_heart_rate_file(os.path.join(directory, "hr_data.csv"), start_s, end_s, hr_rate, seed)
+    images = write_images(os.path.join(directory, "images"), start_s, end_s, image_interval, image_size)
+    return {"rows": rows, "hr_samples": hr_samples, "images": images, "duration_s": round(end_s - start_s, 2)}
+
+
+def parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic session folder (data.csv, hr_data.csv, images/).")
+    parser.add_argument("directory")
+    parser.add_argument("--rows", type=int, default=100_000, help="eye-tracking rows in data.csv")
+    parser.add_argument("--hr-rate", type=int, default=1, help="heart rate samples per second")
+    parser.add_argument("--image-interval", type=int, default=2, help="seconds between screenshots")
+    parser.add_argument("--image-size", type=parse_size, default=(617, 685), help="screenshot size, e.g. 1920x1080")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    summary = write_session(args.directory, args.rows, args.hr_rate, args.image_interval, args.image_size, seed=args.seed)
+    print(", ".join(f"{key}: {value}" for key, value in summary.items()))
+
+
+if __name__ == "__main__":
+    main()
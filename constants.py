@@ -1,10 +1,63 @@
 IMAGE_NAME_TIME_FORMAT = "%M%S"
 TIME_FORMAT_EYETRACKING = "%H:%M:%S.%f"
 TIME_FORMAT_HR = "%H:%M:%S"
+TIME_FORMAT_HR_PRECISE = "%H:%M:%S.%f"
 TIME_FORMAT = "%H:%M:%S"
 DATA_COLUMN_COUNT = 4
+HR_DATA_COLUMN_COUNT = 3
 DELIMITER = ','
 FILE_EXTENSION = ".jpeg"
 LAST_DIR_FILE = 'path_info.json'
+CSV_CHUNK_SIZE = 8 * 1024 * 1024
+SESSION_CACHE_FILE = ".session_cache.npz"
+SESSION_CACHE_VERSION = 6
+LOADING_STAGES = ("Reading heart rate data", "Reading eye-tracking data", "Scanning images",
+                  "Removing noise", "Aggregating heart rate")
+STAGE_HR_PARSE, STAGE_TEXT_PARSE, STAGE_IMAGE_SCAN, STAGE_NOISE_REMOVAL, STAGE_HR_AGGREGATION = range(len(LOADING_STAGES))
+SCREENSHOT_CACHE_BUDGET = 256 * 1024 * 1024
+SCREENSHOT_MAX_SIZE = (1920, 1080)
+SCREENSHOT_PREFETCH_COUNT = 3
+SCREENSHOT_DECODE_THREADS = 2
+SCALED_PIXMAP_CACHE_SIZE = 32
+SCALE_SETTLE_INTERVAL_MS = 150
+THUMBNAIL_DIR = ".thumbnails"
+THUMBNAIL_INDEX_FILE = "index.npz"
+THUMBNAIL_FORMAT_VERSION = 1
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_CHUNK_SIZE = 64
+THUMBNAIL_SAVE_INTERVAL = 2.0
+THUMBNAIL_PREVIEW_HEIGHT = 128
+FILMSTRIP_HEIGHT = 100
+FILMSTRIP_SPACING = 4
+# The first level is the scrubbing preview, the second one is as tall as a filmstrip cell can get.
+THUMBNAIL_HEIGHTS = (THUMBNAIL_PREVIEW_HEIGHT, FILMSTRIP_HEIGHT - 2 * FILMSTRIP_SPACING)
+FILMSTRIP_PIXMAP_CACHE_SIZE = 256
+PLAYBACK_SPEEDS = (1, 2, 4, 8)
+PLAYBACK_FPS_WINDOW = 1.0
+OBJECT_COLUMNS = ("names", "object_codes", "tag_codes", "from_s", "to_s", "hr_avg", "hr_max", "hr_min")
+LIVE_REFRESH_INTERVAL_MS = 500
+NOISE_MIN_DURATION = 0.1
+NOISE_DURATION = 0.5
+LIVE_HR_MAX_DELAY = 10
+LIVE_HR_INTERVAL_STEPS = 60
+HR_BASELINE_METHODS = ("session", "preceding", "calibration")
+HR_BASELINE_WINDOWS = {"preceding": 30, "calibration": 60}
+HR_BASELINE_NAMES = ("Session mean", f"Last {HR_BASELINE_WINDOWS['preceding']} s before",
+                     f"First {HR_BASELINE_WINDOWS['calibration']} s of session")
+EVENT_WINDOW = (-5, 15)
+EVENT_STEP = 0.5
+EVENT_MAX_GAP = 2.5
+# Two-sided 95% quantiles of Student's t by degrees of freedom, the normal 1.96 is reached as they grow.
+EVENT_CI_T = ((1, 12.706), (2, 4.303), (3, 3.182), (4, 2.776), (5, 2.571), (6, 2.447), (7, 2.365), (8, 2.306),
+              (9, 2.262), (10, 2.228), (11, 2.201), (12, 2.179), (13, 2.160), (14, 2.145), (15, 2.131), (16, 2.120),
+              (17, 2.110), (18, 2.101), (19, 2.093), (20, 2.086), (21, 2.080), (22, 2.074), (23, 2.069), (24, 2.064),
+              (25, 2.060), (26, 2.056), (27, 2.052), (28, 2.048), (29, 2.045), (30, 2.042), (40, 2.021), (60, 2.000),
+              (120, 1.980))
+EVENT_CI_Z = 1.96
+PROFILE_ENV_VAR = "VISUALIZER_PROFILE"
+PROFILE_TRACE_FILE = "trace.json"
+PROFILE_MAX_EVENTS = 1_000_000
+PROFILE_REFRESH_INTERVAL_MS = 1000
+DAY_SECONDS = 24 * 3600
 
 WINDOW_HEIGHT = 600
@@ -0,0 +1,297 @@
+import os
+from datetime import datetime
+
+import numpy
+
+from constants import *
+from basic_functions import *
+
+NEWLINE = ord("\n")
+COLON = ord(":")
+DOT = ord(".")
+ZERO = ord("0")
+BYTE_IS_SPACE = numpy.zeros(256, dtype=bool)
+BYTE_IS_SPACE[list(b" \t\r\n\x0b\x0c\x1c\x1d\x1e\x1f")] = True
+FIELD_PADDING = 16
+
+
+class TextColumns:
+    def __init__(self, object_codes, tag_codes, names, from_s, to_s, skipped):
+        self.object_codes = object_codes
+        self.tag_codes = tag_codes
+        self.names = names
+        self.from_s = from_s
+        self.to_s = to_s
+        self.skipped = skipped
+
+    def __len__(self):
+        return len(self.from_s)
+
+    def get_objects(self):
+        return numpy.array(self.names, dtype=object)[self.object_codes]
+
+    def get_tags(self):
+        return numpy.array(self.names, dtype=object)[self.tag_codes]
+
+    def to_records(self):
+        return list(zip(self.get_objects().tolist(), self.get_tags().tolist(), self.from_s.tolist(), self.to_s.tolist()))
+
+
+class HeartRateColumns:
+    def __init__(self, times, values, skipped):
+        self.times = times
+        self.values = values
+        self.skipped = skipped
+
+    def __len__(self):
+        return len(self.times)
+
+
+def report_skipped_rows(path, skipped):
+    if skipped:
+        print(f"Skipped {skipped} malformed rows in '{path}'.")
+
+
+def read_chunks(path, chunk_size=None, on_progress=None):
+    with open(path, 'rb') as file:
+        size = max(os.fstat(file.fileno()).st_size, 1)
+        file.readline()
+        if chunk_size is None:
+            yield file.read()
+            return
+        rest = b""
+        while True:
+            block = file.read(chunk_size)
+            if not block:
+                break
+            if on_progress is not None:
+                on_progress(file.tell() / size)
+            block = rest + block
+            cut = block.rfind(b"\n") + 1
+            rest = block[cut:]
+            if cut:
+                yield block[:cut]
+        if rest:
+            yield rest
+
+
+class FileTail:
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.rest = b""
+        self.header_skipped = False
+
+    def read_rows(self):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return b""
+        if size < self.offset:
+            print(f"'{self.path}' was truncated, reading continues from its new end.")
+            self.offset = size
+            self.rest = b""
+        if size == self.offset:
+            return b""
+
+        with open(self.path, 'rb') as file:
+            file.seek(self.offset)
+            block = self.rest + file.read(size - self.offset)
+            self.offset = file.tell()
+        # A row is only parsed once the writer has finished it with a newline.
+        cut = block.rfind(b"\n") + 1
+        self.rest = block[cut:]
+        block = block[:cut]
+        if not self.header_skipped and cut:
+            block = block[block.find(b"\n") + 1:]
+            self.header_skipped = True
+        return block
+
+
+def split_rows(chunk, field_count):
+    buffer = numpy.frombuffer(chunk + bytes(FIELD_PADDING), dtype=numpy.uint8)
+    data_end = len(chunk)
+
+    newlines = numpy.flatnonzero(buffer[:data_end] == NEWLINE)
+    starts = numpy.concatenate(([0], newlines + 1))
+    ends = numpy.append(newlines, data_end)
+    if chunk.endswith(b"\n"):
+        starts, ends = starts[:-1], ends[:-1]
+
+    while True:
+        leading = (starts < ends) & BYTE_IS_SPACE[buffer[starts]]
+        if not leading.any():
+            break
+        starts[leading] += 1
+    while True:
+        trailing = (starts < ends) & BYTE_IS_SPACE[buffer[ends - 1]]
+        if not trailing.any():
+            break
+        ends[trailing] -= 1
+
+    delimiters = numpy.flatnonzero(buffer[:data_end] == ord(DELIMITER))
+    first_delimiter = numpy.searchsorted(delimiters, starts)
+    delimiter_count = numpy.searchsorted(delimiters, ends) - first_delimiter
+    keep = delimiter_count == field_count - 1
+    skipped = int((~keep & (starts < ends)).sum())
+
+    starts, ends, first_delimiter = starts[keep], ends[keep], first_delimiter[keep]
+    field_starts = [starts] + [delimiters[first_delimiter + i] + 1 for i in range(field_count - 1)]
+    field_ends = [delimiters[first_delimiter + i] for i in range(field_count - 1)] + [ends]
+    return buffer, field_starts, field_ends, skipped
+
+
+def parse_digits(buffer, positions):
+    digits = buffer[positions].astype(numpy.int64) - ZERO
+    return digits, (digits >= 0) & (digits <= 9)
+
+
+def parse_time_fields(buffer, starts, ends, time_format):
+    with_fraction = time_format.endswith(".%f")
+    lengths = ends - starts
+    valid = (lengths >= 10) & (lengths <= 15) if with_fraction else lengths == 8
+    valid &= (buffer[starts + 2] == COLON) & (buffer[starts + 5] == COLON)
+
+    clock = list()
+    for offset in (0, 3, 6):
+        tens, tens_ok = parse_digits(buffer, starts + offset)
+        ones, ones_ok = parse_digits(buffer, starts + offset + 1)
+        valid &= tens_ok & ones_ok
+        clock.append(tens * 10 + ones)
+    hours, minutes, seconds = clock
+    valid &= (hours < 24) & (minutes < 60) & (seconds < 60)
+    result = (hours * 3600 + minutes * 60 + seconds).astype(float)
+
+    if with_fraction:
+        valid &= buffer[starts + 8] == DOT
+        fraction_lengths = lengths - 9
+        microseconds = numpy.zeros(len(starts), dtype=numpy.int64)
+        for i in range(6):
+            digit, digit_ok = parse_digits(buffer, starts + 9 + i)
+            used = i < fraction_lengths
+            valid &= digit_ok | ~used
+            microseconds += numpy.where(used, digit, 0) * 10 ** (5 - i)
+        result += microseconds / 1000000
+
+    # Anything outside the fixed-width layout goes through strptime, so both paths accept the same rows.
+    for i in numpy.flatnonzero(~valid).tolist():
+        field = buffer[starts[i]:ends[i]].tobytes().decode("utf-8", "replace")
+        try:
+            result[i] = time_to_sec(datetime.strptime(field, time_format).time())
+            valid[i] = True
+        except ValueError:
+            result[i] = numpy.nan
+    return result, valid
+
+
+def parse_int_fields(buffer, starts, ends, max_digits=9):
+    lengths = ends - starts
+    valid = (lengths >= 1) & (lengths <= max_digits)
+    result = numpy.zeros(len(starts), dtype=numpy.int64)
+    for i in range(max_digits):
+        digit, digit_ok = parse_digits(buffer, starts + i)
+        used = i < lengths
+        valid &= digit_ok | ~used
+        result = numpy.where(used, result * 10 + digit, result)
+    result = numpy.where(valid, result, 0).astype(float)
+
+    for i in numpy.flatnonzero(~valid & (lengths > 0)).tolist():
+        field = buffer[starts[i]:ends[i]].tobytes().decode("utf-8", "replace")
+        if field.isdigit():
+            try:
+                result[i] = int(field)
+                valid[i] = True
+            except ValueError:
+                pass
+    result[~valid] = numpy.nan
+    return result
+
+
+def intern_fields(buffer, starts, ends):
+    lengths = ends - starts
+    width = max(int(lengths.max(initial=0)), 1)
+    fixed = numpy.zeros((len(starts), width), dtype=numpy.uint8)
+    for i in range(width):
+        used = i < lengths
+        fixed[used, i] = buffer[starts[used] + i]
+    unique, codes = numpy.unique(fixed.view(f"S{width}").ravel(), return_inverse=True)
+    return [name.decode("utf-8", "replace") for name in unique.tolist()], codes.ravel()
+
+
+def merge_names(names, chunk_names, chunk_codes):
+    name_codes = {name: code for code, name in enumerate(names)}
+    mapping = numpy.empty(len(chunk_names), dtype=numpy.int64)
+    for i, name in enumerate(chunk_names):
+        if name not in name_codes:
+            name_codes[name] = len(names)
+            names.append(name)
+        mapping[i] = name_codes[name]
+    return mapping[chunk_codes]
+
+
+def parse_text_chunk(chunk):
+    buffer, field_starts, field_ends, skipped = split_rows(chunk, DATA_COLUMN_COUNT)
+    from_s, from_ok = parse_time_fields(buffer, field_starts[2], field_ends[2], TIME_FORMAT_EYETRACKING)
+    to_s, to_ok = parse_time_fields(buffer, field_starts[3], field_ends[3], TIME_FORMAT_EYETRACKING)
+    keep = from_ok & to_ok
+    skipped += len(keep) - int(keep.sum())
+
+    object_names, object_codes = intern_fields(buffer, field_starts[0][keep], field_ends[0][keep])
+    tag_names, tag_codes = intern_fields(buffer, field_starts[1][keep], field_ends[1][keep])
+    names = list()
+    object_codes = merge_names(names, object_names, object_codes)
+    tag_codes = merge_names(names, tag_names, tag_codes)
+    return TextColumns(object_codes, tag_codes, names, from_s[keep], to_s[keep], skipped)
+
+
+def parse_heart_rate_chunk(chunk):
+    buffer, field_starts, field_ends, skipped = split_rows(chunk, HR_DATA_COLUMN_COUNT)
+    starts, ends = field_starts[0], field_ends[0]
+    # Sensors logging faster than once a second write fractional seconds.
+    precise = ends - starts > 8
+    times = numpy.empty(len(starts), dtype=float)
+    times_ok = numpy.empty(len(starts), dtype=bool)
+    for rows, time_format in ((~precise, TIME_FORMAT_HR), (precise, TIME_FORMAT_HR_PRECISE)):
+        times[rows], times_ok[rows] = parse_time_fields(buffer, starts[rows], ends[rows], time_format)
+    values = parse_int_fields(buffer, field_starts[2], field_ends[2])
+    skipped += len(times_ok) - int(times_ok.sum())
+    return HeartRateColumns(times[times_ok], values[times_ok], skipped)
+
+
+def iter_text_chunks(path, chunk_size=CSV_CHUNK_SIZE, on_progress=None):
+    for chunk in read_chunks(path, chunk_size, on_progress):
+        yield parse_text_chunk(chunk)
+
+
+def iter_heart_rate_chunks(path, chunk_size=CSV_CHUNK_SIZE, on_progress=None):
+    for chunk in read_chunks(path, chunk_size, on_progress):
+        yield parse_heart_rate_chunk(chunk)
+
+
+def load_text_columns(path, chunk_size=CSV_CHUNK_SIZE, on_progress=None):
+    names = list()
+    object_codes, tag_codes, from_s, to_s = list(), list(), list(), list()
+    skipped = 0
+    for columns in iter_text_chunks(path, chunk_size, on_progress):
+        object_codes.append(merge_names(names, columns.names, columns.object_codes))
+        tag_codes.append(merge_names(names, columns.names, columns.tag_codes))
+        from_s.append(columns.from_s)
+        to_s.append(columns.to_s)
+        skipped += columns.skipped
+    if not from_s:
+        empty = numpy.array([], dtype=float)
+        return TextColumns(numpy.array([], dtype=numpy.int64), numpy.array([], dtype=numpy.int64), names, empty, empty, skipped)
+    return TextColumns(numpy.concatenate(object_codes), numpy.concatenate(tag_codes), names,
+                       numpy.concatenate(from_s), numpy.concatenate(to_s), skipped)
+
+
+def load_heart_rate_columns(path, chunk_size=CSV_CHUNK_SIZE, on_progress=None):
+    times, values = list(), list()
+    skipped = 0
+    for columns in iter_heart_rate_chunks(path, chunk_size, on_progress):
+        times.append(columns.times)
+        values.append(columns.values)
+        skipped += columns.skipped
+    if not times:
+        return HeartRateColumns(numpy.array([], dtype=float), numpy.array([], dtype=float), skipped)
+    return HeartRateColumns(numpy.concatenate(times), numpy.concatenate(values), skipped)
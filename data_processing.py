@@ -1,227 +1,234 @@
-import json
-import os
-from datetime import datetime
-from pathlib import Path
+import numpy
 
-from graph_tab import *
+from constants import *
 from basic_functions import *
+from heart_rate import HeartRateSeries, HeartRateBaseline, estimate_log_interval
+from noise_filter import NoiseFilter
+from fixation_table import FixationTable
+from event_response import compute_event_response, get_event_offsets
+from image_index import ImageIndex, scan_image_dir
+from csv_loader import *
+from session_cache import *
+from session_dir import *
+from profiling import profiler
 
 
-class MainDirClass:
-    def __init__(self):
-        self.last_path = ""
-        self.folder = "data"
-        self.data_file_name = "data.csv"
-        self.images_dir_name = "images"
-        self.hr_data_file_name = "hr_data.csv"
-
-    def get_folder_path(self):
-        return f"{self.last_path}\\{self.folder}"
-
-    def get_text_data_path(self):
-        return f"{self.last_path}\\{self.folder}\\{self.data_file_name}"
-
-    def get_hr_data_path(self):
-        return f"{self.last_path}\\{self.folder}\\{self.hr_data_file_name}"
-
-    def get_image_dir_path(self):
-        return f"{self.last_path}\\{self.folder}\\{self.images_dir_name}"
-
-    def change_dir_info(self, path):
-        self.last_path = os.path.dirname(path)
-        self.folder = os.path.basename(path)
-
-    def load_last_path(self):
-        if os.path.exists(LAST_DIR_FILE):
-            with open(LAST_DIR_FILE, 'r') as file:
-                data = json.load(file)
-                self.last_path = data.get("last_path")
-                self.folder = data.get("folder")
+class DataClass:
+    def __init__(self, main_dir: MainDirClass, use_cache=True, report_stage=None):
+        if report_stage is None:
+            report_stage = self.ignore_stage
+        self.hr_baseline_method = HeartRateBaseline()
+        signature = get_session_signature(main_dir)
+        with profiler.span("DataClass: load cache", "load"):
+            cache = load_session_cache(main_dir, signature) if use_cache else None
+        if cache is None:
+            with profiler.stages("DataClass.build", LOADING_STAGES, report_stage) as traced_report_stage:
+                self.build(main_dir, traced_report_stage)
+            if use_cache:
+                with profiler.span("DataClass: save cache", "load"):
+                    save_session_cache(main_dir, signature, self.get_cache_arrays())
+        else:
+            with profiler.span("DataClass.restore", "load"):
+                self.restore(cache)
+        self.aggregated_data = dict()
+        self.event_responses = dict()
 
-    def save_last_path(self):
-        with open(LAST_DIR_FILE, 'w') as file:
-            data = {"last_path": self.last_path, "folder": self.folder}
-            json.dump(data, file)
+    @staticmethod
+    def ignore_stage(stage, fraction=0.0):
+        pass
 
-
-class DataClass:
-    def __init__(self, main_dir: MainDirClass):
-        self.hr_data = self.load_heart_rate_data(main_dir)
+    def build(self, main_dir, report_stage):
+        report_stage(STAGE_HR_PARSE)
+        self.hr_times, self.hr_values = self.load_heart_rate_data(
+            main_dir, lambda fraction: report_stage(STAGE_HR_PARSE, fraction))
 
         self.hr_log_interval = self.calculate_hr_log_interval()
         self.hr_baseline = self.calculate_hr_baseline()
 
-        image_names = self.get_image_names(main_dir)
-        self.gaze_capture_times = self.get_capture_times_from_names(image_names)
-
-        text_data_list = self.load_text_data(main_dir)
-        self.start_time = self.calculate_start_time(text_data_list)
-        self.object_data = self.create_object_data(text_data_list)
+        report_stage(STAGE_TEXT_PARSE)
+        text_columns = self.load_text_data(main_dir, lambda fraction: report_stage(STAGE_TEXT_PARSE, fraction))
+        text_columns.from_s, text_columns.to_s = unwrap_interval_times(text_columns.from_s, text_columns.to_s,
+                                                                       self.hr_times[0].item())
+        self.start_s = self.calculate_start_time(text_columns)
+        self.start_time = sec_to_time(self.start_s)
+
+        report_stage(STAGE_IMAGE_SCAN)
+        self.image_index = scan_image_dir(main_dir.get_image_dir_path())
+        self.gaze_capture_times = self.place_capture_times(self.image_index.capture_times)
+        self.hr_series = self.create_hr_series()
+
+        report_stage(STAGE_NOISE_REMOVAL)
+        clean_data = self.remove_noise(text_columns)
+
+        report_stage(STAGE_HR_AGGREGATION)
+        self.object_columns = self.create_object_columns(clean_data, text_columns.names)
+        self.object_data = self.create_object_data(self.object_columns)
+        self.object_starts, self.object_ends = self.create_object_timeline()
+
+    def get_cache_arrays(self):
+        arrays = dict(self.object_columns)
+        arrays.update(self.image_index.get_arrays())
+        arrays.update(hr_times=self.hr_times, hr_values=self.hr_values, gaze_capture_times=self.gaze_capture_times,
+                      start_s=self.start_s, hr_log_interval=self.hr_log_interval, hr_baseline=self.hr_baseline)
+        return arrays
+
+    def restore(self, cache):
+        self.hr_times = cache["hr_times"]
+        self.hr_values = cache["hr_values"]
+        self.hr_log_interval = cache["hr_log_interval"].item()
+        self.hr_baseline = cache["hr_baseline"].item()
+        self.image_index = ImageIndex.from_arrays(cache)
+        self.gaze_capture_times = cache["gaze_capture_times"]
+        self.start_s = cache["start_s"].item()
+        self.start_time = sec_to_time(self.start_s)
+        self.hr_series = self.create_hr_series()
+        self.object_columns = {key: cache[key] for key in OBJECT_COLUMNS}
+        self.object_data = self.create_object_data(self.object_columns)
+        self.object_starts, self.object_ends = self.create_object_timeline()
+
+    def create_object_timeline(self):
+        starts, ends = self.object_data.from_s, self.object_data.to_s
+        # Fixations are in chronological order, so the first one ending at or after t is the only candidate.
+        return starts, numpy.maximum.accumulate(ends) if len(ends) else ends
+
+    def get_object_indices_at_times(self, times):
+        times = numpy.asarray(times, dtype=float)
+        if not len(self.object_starts):
+            return numpy.full(times.shape, -1)
+        idx = numpy.searchsorted(self.object_ends, times, side="left")
+        found = idx < len(self.object_ends)
+        idx = numpy.minimum(idx, len(self.object_ends) - 1)
+        found &= self.object_starts[idx] <= times
+        return numpy.where(found, idx, -1)
 
     def get_object_at_time(self, t):
-        selected_entry = next(
-            (entry for entry in self.object_data if time_to_sec(entry[2]) <= t <= time_to_sec(entry[3])),
-            None)
-
-        if selected_entry:
-            return selected_entry[0]
+        idx = self.get_object_indices_at_times(t).item()
+        if idx >= 0:
+            return self.object_data.get_name(self.object_data.object_codes[idx])
         return ""
 
+    def get_objects_at_times(self, times):
+        names = numpy.append(self.object_columns["names"].astype(object), "")
+        codes = numpy.append(self.object_columns["object_codes"], len(names) - 1)
+        return names[codes[self.get_object_indices_at_times(times)]]
+
+    def set_hr_baseline_method(self, baseline_method):
+        # Only ΔHR depends on the baseline, the HR statistics of the fixations are kept.
+        if baseline_method == self.hr_baseline_method:
+            return
+        self.hr_baseline_method = baseline_method
+        self.object_data = self.create_object_data(self.object_columns)
+        self.aggregated_data = dict()
+
+    def get_hr_baselines(self, times_s):
+        return self.hr_baseline_method.get_values(self.hr_series, self.hr_baseline, times_s)
+
+    def get_hr_sample_objects(self):
+        return self.get_objects_at_times(self.hr_series.times)
+
+    def get_aggregated_data(self, group_by):
+        if group_by not in self.aggregated_data:
+            self.aggregated_data[group_by] = self.aggregate_object_data(group_by)
+        return self.aggregated_data[group_by]
+
+    def get_event_response(self, group_by, relative=False, window=EVENT_WINDOW):
+        key = group_by, relative, window
+        if key not in self.event_responses:
+            self.event_responses[key] = compute_event_response([self], group_by, get_event_offsets(*window), relative)
+        return self.event_responses[key]
+
+    def aggregate_object_data(self, group_by):
+        columns = self.object_columns
+        names = columns["names"].tolist()
+        group_codes = columns[f"{group_by}_codes"]
+        group_count = len(names)
+        rows = numpy.arange(len(group_codes))
+
+        durations = columns["to_s"] - columns["from_s"]
+        durations = numpy.where(durations <= 0, 1, durations)
+        hr_valid = ~numpy.isnan(columns["hr_avg"])
+        hr_changes = self.object_data.hr_change
+        change_valid = ~numpy.isnan(hr_changes)
+
+        view_counts = numpy.bincount(group_codes, minlength=group_count)
+        total_times = numpy.bincount(group_codes, durations, group_count)
+        hr_times = numpy.bincount(group_codes[hr_valid], durations[hr_valid], group_count)
+        hr_sums = numpy.bincount(group_codes[hr_valid], (columns["hr_avg"] * durations)[hr_valid], group_count)
+        # ΔHR of a group is weighted like its HR, as the baseline may differ between its fixations.
+        change_times = numpy.bincount(group_codes[change_valid], durations[change_valid], group_count)
+        change_sums = numpy.bincount(group_codes[change_valid], (hr_changes * durations)[change_valid], group_count)
+        hr_maxs = numpy.full(group_count, numpy.nan)
+        numpy.fmax.at(hr_maxs, group_codes, columns["hr_max"])
+        hr_mins = numpy.full(group_count, numpy.nan)
+        numpy.fmin.at(hr_mins, group_codes, columns["hr_min"])
+        first_rows = numpy.full(group_count, len(rows))
+        numpy.minimum.at(first_rows, group_codes, rows)
+        last_rows = numpy.full(group_count, -1)
+        numpy.maximum.at(last_rows, group_codes, rows)
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            hr_avgs = hr_sums / hr_times
+            hr_changes = change_sums / change_times
+
+        groups = numpy.argsort(first_rows)[:numpy.count_nonzero(view_counts)]
+        if group_by == "object":
+            object_codes, tag_codes = groups, columns["tag_codes"][last_rows[groups]]
+        else:
+            object_codes, tag_codes = numpy.full(len(groups), -1), groups
+        no_times = numpy.full(len(groups), numpy.nan)
+        return FixationTable(names, object_codes, tag_codes, no_times, no_times, total_times[groups], hr_avgs[groups],
+                             hr_changes[groups], hr_maxs[groups], hr_mins[groups], view_counts[groups])
+
     def calculate_hr_baseline(self):
-        hr_values = list(filter(lambda x: x is not None, self.hr_data.values()))
-        return sum(hr_values) // len(hr_values)
+        hr_values = self.hr_values[~numpy.isnan(self.hr_values)]
+        return int(hr_values.sum()) // len(hr_values)
 
-    @staticmethod
-    def get_capture_times_from_names(image_names):
-        gaze_times = list()
-        for name in image_names:
-            if len(name) != 6 or not name[0:2].isdigit() or not name[2:4].isdigit() or not name[4:6].isdigit():
-                continue
-            hours = int(name[0:2])
-            minutes = int(name[2:4])
-            seconds = int(name[4:6])
-            if 60 > minutes > 0 or 60 > seconds > 0:
-                gaze_time = hours * 3600 + minutes * 60 + seconds
-                gaze_times.append(gaze_time)
-        return numpy.array(gaze_times)
+    def place_capture_times(self, capture_times):
+        # Screenshot names only carry the time of day, so they are put on the day nearest the middle of the session.
+        return place_day_times(capture_times, (self.start_s + self.hr_times.max().item()) / 2)
 
-    @staticmethod
-    def get_image_name_from_seconds(s):
-        hours = s // 3600
-        minutes = (s % 3600) // 60
-        seconds = s % 60
-        return f"{hours:02}{minutes:02}{seconds:02}"
-
-    def calculate_start_time(self, text_data_list):
-        hr_first_time = min(list(self.hr_data.keys()))
-        objects_data_first_time = text_data_list[0][2]
-        return min(hr_first_time, objects_data_first_time)
-
-    def calculate_hr_log_interval(self):
-        hr_data_iter = iter(self.hr_data)
-        hr_time1 = next(hr_data_iter)
-        hr_time2 = next(hr_data_iter)
-        hr_time3 = next(hr_data_iter)
-        interval = time_to_sec(hr_time2) - time_to_sec(hr_time1)
-        if interval != time_to_sec(hr_time3) - time_to_sec(hr_time2):
-            print(f"HR data times are inconsistent. (Using hr time interval {interval}.)")
-        return interval
+    def get_nearest_capture_times(self, real_times):
+        return self.gaze_capture_times[find_nearest_index(self.gaze_capture_times, real_times)]
 
-    @staticmethod
-    def load_heart_rate_data(main_dir):
-        data = dict()
-        with open(main_dir.get_hr_data_path(), 'r') as file:
-            file.readline()
-            for line in file:
-                record = line.strip().split(DELIMITER)
-                if len(record) != 3:
-                    continue
-                real_time_string, therapy_time_string, hr = record
-                try:
-                    real_time = datetime.strptime(real_time_string, TIME_FORMAT_HR).time()
-                except ValueError:
-                    real_time = datetime.min.time()
-                if not hr.isdigit():
-                    hr_num = None
-                else:
-                    hr_num = int(hr)
-                data[real_time] = hr_num
-        return data
+    def get_image_size(self, capture_time):
+        return self.image_index.get_size(capture_time)
+
+    def calculate_start_time(self, text_columns):
+        hr_first_time = self.hr_times.min()
+        objects_data_first_time = text_columns.from_s[0]
+        return min(hr_first_time.item(), objects_data_first_time.item())
+
+    def calculate_hr_log_interval(self, report=True):
+        return estimate_log_interval(self.hr_times, report)
 
     @staticmethod
-    def load_text_data(main_dir):
-        data = list()
-        with open(main_dir.get_text_data_path(), 'r') as file:
-            file.readline()
-            for line in file:
-                record = line.strip().split(DELIMITER)
-                if len(record) == DATA_COLUMN_COUNT:
-                    obj, tag = record[0], record[1]
-                    try:
-                        from_t = datetime.strptime(record[2], TIME_FORMAT_EYETRACKING)
-                        to_t = datetime.strptime(record[3], TIME_FORMAT_EYETRACKING)
-                    except ValueError:
-                        continue
-                    data.append(tuple([obj, tag, from_t.time(), to_t.time()]))
-        return data
+    def load_heart_rate_data(main_dir, on_progress=None):
+        path = main_dir.get_hr_data_path()
+        hr_columns = load_heart_rate_columns(path, on_progress=on_progress)
+        report_skipped_rows(path, hr_columns.skipped)
+        return spread_duplicate_times(unwrap_day_times(hr_columns.times)), hr_columns.values
 
     @staticmethod
-    def get_image_names(main_dir):
-        directory = Path(main_dir.get_image_dir_path())
-        return [file.name.strip(FILE_EXTENSION) for file in directory.glob(f"*{FILE_EXTENSION}")]
+    def load_text_data(main_dir, on_progress=None):
+        path = main_dir.get_text_data_path()
+        text_columns = load_text_columns(path, on_progress=on_progress)
+        report_skipped_rows(path, text_columns.skipped)
+        return text_columns
+
+    def create_hr_series(self):
+        return HeartRateSeries(self.hr_times - self.start_s, self.hr_values, self.hr_log_interval)
 
     def get_all_heart_rates(self, time_from_s, time_to_s):
-        if time_from_s < 0:
-            time_from_s = 0
-        hr_list = list()
-        log_interval = self.hr_log_interval
-        weighing = False
-        hr_data_iter = iter(self.hr_data)
-        while True:
-            try:
-                t = next(hr_data_iter)
-            except StopIteration:
-                break
-            session_time_sec = time_to_sec(t) - time_to_sec(self.start_time)
-            if self.hr_data[t] is None:
-                if session_time_sec + log_interval / 2 >= time_to_s:
-                    return []
-                continue
-            if weighing:
-                if session_time_sec + log_interval / 2 >= time_to_s:
-                    time_interval = log_interval - ((session_time_sec + log_interval // 2) - time_to_s)
-                    hr_list.append((self.hr_data[t], time_interval))
-                    break
-                hr_list.append((self.hr_data[t], log_interval))
-            else:
-                if session_time_sec + log_interval / 2 > time_from_s:
-                    weighing = True
-                    time_interval = (session_time_sec + log_interval // 2) - time_from_s
-                    hr_list.append((self.hr_data[t], time_interval))
-                    if time_to_s - time_from_s == 0:
-                        return [(self.hr_data[t], 1)]
-        return hr_list
-
-    def get_hr_change(self, record_avg):
-        if record_avg is None:
-            return None
-        return record_avg - self.hr_baseline
+        return self.hr_series.get_window(time_from_s, time_to_s)
+
+    def get_heart_rate_stats(self, times_from_s, times_to_s):
+        return self.hr_series.get_window_stats(times_from_s, times_to_s)
 
     @staticmethod
-    def remove_noise(data):
-        clean_data = list()
-        focused_obj = None
-        noise_record = None
-        for record in data:
-            obj, tag, from_t, to_t = record
-            if focused_obj == obj:
-                focused_obj_record = clean_data.pop()
-                _, _, foc_from_t, foc_to_t = focused_obj_record
-                clean_data.append((obj, tag, foc_from_t, to_t))
-                noise_record = None
-                continue
-
-            sum_sec = time_to_sec(to_t) - time_to_sec(from_t)
-            if sum_sec < 0.1:
-                continue
-
-            if noise_record is not None:
-                if noise_record[0] == obj:
-                    record = obj, tag, noise_record[2], to_t
-                else:
-                    clean_data.append(noise_record)
-                    focused_obj = noise_record[0]
-                    noise_record = None
-
-            if sum_sec < 0.5:
-                noise_record = record
-            else:
-                clean_data.append(record)
-                focused_obj = obj
-
-        if noise_record is not None:
-            clean_data.append(noise_record)
-        return clean_data
+    def remove_noise(text_columns):
+        noise_filter = NoiseFilter()
+        clean_data = list(noise_filter.push_batch(text_columns.object_codes, text_columns.tag_codes,
+                                                  text_columns.from_s, text_columns.to_s))
+        return clean_data + noise_filter.finish()
 
     @staticmethod
     def make_average_from_hr_list(hr_list):
@@ -246,34 +253,21 @@ class DataClass:
                 hr_min = hr
         return hr_max, hr_min
 
-    def create_object_data(self, text_data):
-        object_data = list()
-        clean_data = self.remove_noise(text_data)
-        for object_record in clean_data:
-            obj, tag, from_t, to_t = object_record
-
-            from_s = time_to_sec(from_t) - time_to_sec(self.start_time)
-            from_t = sec_to_time(from_s)
-            to_s = time_to_sec(to_t) - time_to_sec(self.start_time)
-            to_t = sec_to_time(to_s)
-
-            if int(from_s) == 0 and int(to_s) == 0:
-                continue
-
-            sum_t = to_s - from_s
-            if sum_t <= 0:
-                sum_t = 1
-
-            hr_list = self.get_all_heart_rates(from_s, to_s)
-
-            hr_avg = self.make_average_from_hr_list(hr_list)
-            hr_change = self.get_hr_change(hr_avg)
-            hr_max, hr_min = self.get_max_min_from_hr_list(hr_list)
-            if hr_max is None:
-                hr_range = None
-            else:
-                hr_range = hr_max - hr_min + 1
-            view_count = 1
-
-            object_data.append((obj, tag, from_t, to_t, sum_t, hr_avg, hr_change, hr_max, hr_min, hr_range, view_count))
-        return object_data
+    def create_object_columns(self, clean_data, names):
+        columns = numpy.array(clean_data, dtype=float).reshape(-1, 4)
+        froms_s = columns[:, 2] - self.start_s
+        tos_s = columns[:, 3] - self.start_s
+        keep = (froms_s.astype(int) != 0) | (tos_s.astype(int) != 0)
+        froms_s, tos_s = froms_s[keep], tos_s[keep]
+        object_codes = columns[keep, 0].astype(numpy.int64)
+        tag_codes = columns[keep, 1].astype(numpy.int64)
+
+        hr_avgs, hr_maxs, hr_mins = self.get_heart_rate_stats(froms_s, tos_s)
+        return {"names": numpy.array(names, dtype=str), "object_codes": object_codes, "tag_codes": tag_codes,
+                "from_s": froms_s, "to_s": tos_s, "hr_avg": hr_avgs, "hr_max": hr_maxs, "hr_min": hr_mins}
+
+    def create_object_data(self, object_columns):
+        from_s, to_s, hr_avgs = object_columns["from_s"], object_columns["to_s"], object_columns["hr_avg"]
+        return FixationTable(object_columns["names"].tolist(), object_columns["object_codes"], object_columns["tag_codes"],
+                             from_s, to_s, numpy.maximum(to_s - from_s, 0), hr_avgs, hr_avgs - self.get_hr_baselines(from_s),
+                             object_columns["hr_max"], object_columns["hr_min"], numpy.ones(len(from_s), dtype=numpy.int64))
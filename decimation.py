@@ -0,0 +1,48 @@
+import math
+
+import numpy
+
+
+def reduce_pairs(values, positions, take_smaller):
+    if len(values) % 2:
+        values = numpy.append(values, numpy.nan)
+        positions = numpy.append(positions, positions[-1])
+    first, second = values[0::2], values[1::2]
+    better = second < first if take_smaller else second > first
+    take_second = numpy.isnan(first) | better
+    return numpy.where(take_second, second, first), numpy.where(take_second, positions[1::2], positions[0::2])
+
+
+class MinMaxPyramid:
+    def __init__(self, xs, ys):
+        self.xs = numpy.asarray(xs, dtype=float)
+        self.ys = numpy.asarray(ys, dtype=float)
+        self.levels = list()
+
+        min_ys, min_xs, max_ys, max_xs = self.ys, self.xs, self.ys, self.xs
+        while len(min_ys) > 1:
+            min_ys, min_xs = reduce_pairs(min_ys, min_xs, True)
+            max_ys, max_xs = reduce_pairs(max_ys, max_xs, False)
+            self.levels.append((min_xs, min_ys, max_xs, max_ys))
+
+    def get_level(self, sample_count, max_points):
+        if sample_count <= max_points or not self.levels:
+            return 0
+        # Every bin of a level k > 0 covers 2 ** k samples and draws two points.
+        level = math.ceil(math.log2(2 * sample_count / max(max_points, 1)))
+        return min(level, len(self.levels))
+
+    def get_points(self, x_from, x_to, max_points):
+        first = max(int(numpy.searchsorted(self.xs, x_from)) - 1, 0)
+        last = min(int(numpy.searchsorted(self.xs, x_to)) + 1, len(self.xs))
+        level = self.get_level(last - first, max_points)
+        if level == 0:
+            return self.xs[first:last], self.ys[first:last]
+
+        min_xs, min_ys, max_xs, max_ys = self.levels[level - 1]
+        bins = slice(first >> level, (last >> level) + 1)
+        min_xs, min_ys, max_xs, max_ys = min_xs[bins], min_ys[bins], max_xs[bins], max_ys[bins]
+        min_first = min_xs <= max_xs
+        xs = numpy.column_stack((numpy.where(min_first, min_xs, max_xs), numpy.where(min_first, max_xs, min_xs)))
+        ys = numpy.column_stack((numpy.where(min_first, min_ys, max_ys), numpy.where(min_first, max_ys, min_ys)))
+        return xs.ravel(), ys.ravel()
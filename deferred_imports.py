@@ -0,0 +1,68 @@
+import importlib
+import subprocess
+import sys
+from time import perf_counter
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+# Imported in the background while the folder picker is shown, in the order the picker is likely to need them.
+DEFERRED_MODULES = ("numpy", "data_processing", "session_loader", "pyqtgraph", "main_window", "live_session",
+                    "workspace_window")
+IMPORT_TIMES_SHOWN = 15
+
+
+class ModuleLoader(QThread):
+    failed = pyqtSignal(str)
+
+    def __init__(self, module_names=DEFERRED_MODULES, parent=None):
+        super().__init__(parent)
+        self.module_names = module_names
+        self.import_times = dict()
+        self.error = None
+
+    def run(self):
+        for name in self.module_names:
+            start = perf_counter()
+            try:
+                importlib.import_module(name)
+            except Exception as error:
+                self.error = f"{name}: {error}"
+                self.failed.emit(self.error)
+                return
+            self.import_times[name] = perf_counter() - start
+
+
+def parse_import_times(report):
+    # Lines look like "import time:  self [us] | cumulative | imported package", nested imports are indented.
+    import_times = list()
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        import_times.append((name.strip(), depth, int(self_us) / 1000, int(cumulative_us) / 1000))
+    return import_times
+
+
+def measure_import_times(entry_module):
+    # A fresh interpreter is needed, as every module is imported only once per process.
+    code = f"import {entry_module}; " + "; ".join(f"import {name}" for name in DEFERRED_MODULES)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return parse_import_times(result.stderr)
+
+
+def print_import_times(entry_module):
+    import_times = measure_import_times(entry_module)
+    top_level = [(name, cumulative_ms) for name, depth, self_ms, cumulative_ms in import_times if depth == 0]
+
+    print("Imported before the folder picker is shown:")
+    print(f"  {entry_module:30} {dict(top_level).get(entry_module, 0):10.1f} ms")
+    print("Imported in the background:")
+    for name, cumulative_ms in top_level:
+        if name in DEFERRED_MODULES:
+            print(f"  {name:30} {cumulative_ms:10.1f} ms")
+    print("Slowest modules by their own import time:")
+    for name, depth, self_ms, cumulative_ms in sorted(import_times, key=lambda item: -item[2])[:IMPORT_TIMES_SHOWN]:
+        print(f"  {name:30} {self_ms:10.1f} ms")
@@ -0,0 +1,60 @@
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget, QTableWidgetItem,
+                             QFileDialog, QHeaderView)
+
+from constants import *
+from profiling import profiler, get_peak_memory_bytes
+
+DIAGNOSTICS_COLUMNS = ("Span", "Calls", "Total ms", "Mean ms", "Max ms")
+
+
+class DiagnosticsPanel(QWidget):
+    def __init__(self):
+        super().__init__()
+
+        self.summary_label = QLabel("", self)
+
+        self.save_button = QPushButton("Save trace", self)
+        self.save_button.clicked.connect(self.save_trace)
+
+        self.table = QTableWidget(0, len(DIAGNOSTICS_COLUMNS), self)
+        self.table.setHorizontalHeaderLabels(DIAGNOSTICS_COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+
+        top_layout = QHBoxLayout()
+        top_layout.addWidget(self.summary_label)
+        top_layout.addStretch()
+        top_layout.addWidget(self.save_button)
+
+        layout = QVBoxLayout()
+        layout.addLayout(top_layout)
+        layout.addWidget(self.table)
+        self.setLayout(layout)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(PROFILE_REFRESH_INTERVAL_MS)
+        self.refresh()
+
+    def refresh(self):
+        # The table is only rebuilt while the tab is shown.
+        if not self.isVisible() and self.table.rowCount():
+            return
+        summary = sorted(profiler.get_summary(), key=lambda item: -item[2])
+        self.table.setRowCount(len(summary))
+        for row, (name, calls, total_s, max_s) in enumerate(summary):
+            values = (name, str(calls), f"{total_s * 1000:.1f}", f"{total_s * 1000 / calls:.2f}", f"{max_s * 1000:.2f}")
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+
+        text = f"Peak memory: {get_peak_memory_bytes() / 1e6:.1f} MB"
+        if profiler.dropped_events:
+            text += f", {profiler.dropped_events} trace events dropped"
+        self.summary_label.setText(text)
+
+    def save_trace(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save Trace", profiler.trace_path, "Trace files (*.json)")
+        if path and profiler.write_trace(path):
+            self.summary_label.setText(f"Trace saved to '{path}'.")
@@ -0,0 +1,105 @@
+import numpy
+
+from constants import *
+
+
+def get_event_offsets(before_s=EVENT_WINDOW[0], after_s=EVENT_WINDOW[1], step_s=EVENT_STEP):
+    return before_s + numpy.arange(int(round((after_s - before_s) / step_s)) + 1) * step_s
+
+
+def sample_event_windows(series, onsets_s, offsets_s):
+    # One row per event, HR is interpolated at every onset + offset at once.
+    onsets_s = numpy.asarray(onsets_s, dtype=float)
+    windows = numpy.full((len(onsets_s), len(offsets_s)), numpy.nan)
+    valid_times = series.times[series.valid]
+    valid_values = series.values[series.valid]
+    if len(valid_times) < 2 or not len(onsets_s):
+        return windows
+
+    times = (onsets_s[:, None] + offsets_s[None, :]).ravel()
+    values = numpy.interp(times, valid_times, valid_values, left=numpy.nan, right=numpy.nan)
+    # No HR is made up across missing samples.
+    idx = numpy.clip(numpy.searchsorted(valid_times, times), 1, len(valid_times) - 1)
+    values[valid_times[idx] - valid_times[idx - 1] > EVENT_MAX_GAP * series.log_interval] = numpy.nan
+    return values.reshape(windows.shape)
+
+
+def get_t_quantiles(degrees):
+    # Interpolated in 1 / degrees between the tabulated values, which is exact for the tabulated degrees.
+    inverse = [0.0] + [1 / df for df, t in reversed(EVENT_CI_T)]
+    quantiles = [EVENT_CI_Z] + [t for df, t in reversed(EVENT_CI_T)]
+    return numpy.interp(1 / numpy.maximum(degrees, 1), inverse, quantiles)
+
+
+class EventResponse:
+    def __init__(self, labels, offsets, means, lows, highs, counts, event_counts):
+        self.labels = labels
+        self.offsets = offsets
+        # One row per label and one column per offset.
+        self.means = means
+        self.lows = lows
+        self.highs = highs
+        self.counts = counts
+        self.event_counts = event_counts
+
+    def __len__(self):
+        return len(self.labels)
+
+    def get_columns(self):
+        rows = len(self.labels) * len(self.offsets)
+        return {"label": numpy.repeat(numpy.array(self.labels, dtype=str), len(self.offsets)),
+                "offset_s": numpy.tile(self.offsets, len(self.labels)), "hr_mean": self.means.reshape(rows),
+                "ci_low": self.lows.reshape(rows), "ci_high": self.highs.reshape(rows),
+                "samples": self.counts.reshape(rows), "events": numpy.repeat(self.event_counts, len(self.offsets))}
+
+
+def get_session_events(data, group_by):
+    table = data.object_data
+    labels = table.get_objects() if group_by == "object" else table.get_tags()
+    return data.hr_series, table.from_s, labels
+
+
+def sample_session_events(data, group_by, offsets):
+    series, onsets, labels = get_session_events(data, group_by)
+    return sample_event_windows(series, onsets, offsets), labels
+
+
+def compute_event_response(sessions, group_by, offsets, relative=False):
+    return pool_event_windows([sample_session_events(data, group_by, offsets) for data in sessions], offsets, relative)
+
+
+def pool_event_windows(session_events, offsets, relative=False):
+    # Events of all sessions are pooled by label, so the same object in several sessions is averaged together.
+    # Each session gives its sampled windows and their labels, which worker processes can send back as they are.
+    windows = [session_windows for session_windows, session_labels in session_events]
+    labels = [session_labels for session_windows, session_labels in session_events]
+    windows = numpy.concatenate(windows) if windows else numpy.empty((0, len(offsets)))
+    labels = numpy.concatenate(labels) if labels else numpy.array([], dtype=str)
+
+    if relative:
+        # Each event is measured against its own HR before the onset.
+        before = windows[:, offsets < 0]
+        before_counts = numpy.count_nonzero(~numpy.isnan(before), axis=1)
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            windows = windows - (numpy.nansum(before, axis=1) / before_counts)[:, None]
+
+    names, codes = numpy.unique(labels, return_inverse=True)
+    order = numpy.argsort(codes, kind="stable")
+    windows, codes = windows[order], codes[order]
+    starts = numpy.flatnonzero(numpy.diff(codes, prepend=-1))
+    if not len(starts):
+        empty = numpy.empty((0, len(offsets)))
+        return EventResponse([], offsets, empty, empty, empty, empty.astype(numpy.int64), numpy.array([], dtype=numpy.int64))
+
+    valid = ~numpy.isnan(windows)
+    values = numpy.where(valid, windows, 0)
+    counts = numpy.add.reduceat(valid, starts, axis=0).astype(numpy.int64)
+    sums = numpy.add.reduceat(values, starts, axis=0)
+    square_sums = numpy.add.reduceat(values * values, starts, axis=0)
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        means = sums / counts
+        variances = numpy.maximum(square_sums - sums * means, 0) / (counts - 1)
+        half_widths = get_t_quantiles(counts - 1) * numpy.sqrt(variances / counts)
+    half_widths[counts < 2] = numpy.nan
+    event_counts = numpy.diff(numpy.append(starts, len(codes)))
+    return EventResponse(names.tolist(), offsets, means, means - half_widths, means + half_widths, counts, event_counts)
@@ -0,0 +1,89 @@
+import numpy
+import pyqtgraph
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QComboBox, QCheckBox, QPushButton, QLabel, QFileDialog
+
+from constants import *
+from table_export import write_csv_table
+from profiling import profiled
+
+EVENT_GROUP_OPTIONS = (("Objects", "object"), ("Tags", "tag"))
+EVENT_CI_ALPHA = 50
+
+
+class EventResponseTab(QWidget):
+    # Works on a single session (DataClass) or on all sessions of a Workspace, both provide get_event_response.
+    def __init__(self, source):
+        super().__init__()
+        self.source = source
+
+        self.group_dropdown = QComboBox()
+        self.group_dropdown.addItems([option[0] for option in EVENT_GROUP_OPTIONS])
+        self.group_dropdown.currentIndexChanged.connect(lambda index: self.update_plot())
+
+        self.relative_checkbox = QCheckBox("Relative to HR before onset")
+        self.relative_checkbox.toggled.connect(lambda checked: self.update_plot())
+
+        self.export_button = QPushButton("Export...")
+        self.export_button.clicked.connect(self.export_response)
+
+        self.info_label = QLabel()
+
+        self.plot = pyqtgraph.PlotWidget()
+        self.plot.hideButtons()
+        self.plot.setBackground('w')
+        self.plot.setMouseEnabled(x=False, y=False)
+        self.plot.setLabel("bottom", "Time from fixation onset (s)")
+        self.legend = self.plot.addLegend()
+
+        controls = QHBoxLayout()
+        controls.addWidget(self.group_dropdown)
+        controls.addWidget(self.relative_checkbox)
+        controls.addWidget(self.info_label)
+        controls.addStretch()
+        controls.addWidget(self.export_button)
+        layout = QVBoxLayout(self)
+        layout.addLayout(controls)
+        layout.addWidget(self.plot)
+
+    def get_response(self):
+        group_by = EVENT_GROUP_OPTIONS[self.group_dropdown.currentIndex()][1]
+        return self.source.get_event_response(group_by, self.relative_checkbox.isChecked())
+
+    @profiled("EventResponseTab.update_plot", "event response")
+    def update_plot(self):
+        response = self.get_response()
+        self.plot.clear()
+        self.legend.clear()
+        self.plot.addItem(pyqtgraph.InfiniteLine(pos=0, angle=90, pen=pyqtgraph.mkPen(
+            color="#FBAF00", width=2, style=Qt.PenStyle.DashLine)))
+        self.plot.setLabel("left", "ΔHR" if self.relative_checkbox.isChecked() else "Heart rate")
+
+        for i, label in enumerate(response.labels):
+            color = pyqtgraph.intColor(i, hues=max(len(response), 1))
+            # The band narrows to the mean where fewer than two samples give no interval.
+            low = pyqtgraph.PlotDataItem(response.offsets, numpy.where(numpy.isnan(response.lows[i]), response.means[i],
+                                                                       response.lows[i]))
+            high = pyqtgraph.PlotDataItem(response.offsets, numpy.where(numpy.isnan(response.highs[i]),
+                                                                        response.means[i], response.highs[i]))
+            band_color = pyqtgraph.mkColor(color)
+            band_color.setAlpha(EVENT_CI_ALPHA)
+            self.plot.addItem(pyqtgraph.FillBetweenItem(low, high, brush=band_color))
+            self.plot.plot(response.offsets, response.means[i], pen=pyqtgraph.mkPen(color=color, width=2),
+                           name=f"{label} ({response.event_counts[i]})", connect="finite")
+        self.plot.setXRange(response.offsets[0], response.offsets[-1], padding=0)
+        self.info_label.setText(f"{numpy.sum(response.event_counts)} fixations, mean ± 95% CI")
+
+    def refresh_data(self):
+        if self.isVisible():
+            self.update_plot()
+
+    def showEvent(self, event):
+        # The response is only computed once the tab is opened.
+        super().showEvent(event)
+        self.update_plot()
+
+    def export_response(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Event Response", "event_response.csv", "CSV files (*.csv)")
+        if path:
+            write_csv_table(path, self.get_response())
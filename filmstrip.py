@@ -0,0 +1,181 @@
+from collections import OrderedDict
+
+import numpy
+from PyQt6.QtCore import Qt, QThread, QRect, pyqtSignal
+from PyQt6.QtGui import QPainter, QPixmap, QColor, QPen
+from PyQt6.QtWidgets import QAbstractScrollArea
+
+from constants import *
+from thumbnails import build_thumbnails
+
+
+class ThumbnailBuilder(QThread):
+    progress = pyqtSignal(int, int)
+
+    def __init__(self, store, image_dir, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.image_dir = image_dir
+        self.capture_times = numpy.array([], dtype=numpy.int64)
+        self.pending = False
+        self.cancel_requested = False
+        self.finished.connect(self.on_finished)
+
+    def request(self, capture_times):
+        # Screenshots added while a build runs are picked up by the next one.
+        self.capture_times = numpy.array(capture_times, dtype=numpy.int64)
+        self.pending = True
+        if not self.isRunning():
+            self.start()
+
+    def cancel(self):
+        self.cancel_requested = True
+
+    def run(self):
+        self.pending = False
+        try:
+            build_thumbnails(self.store, self.image_dir, self.capture_times, on_progress=self.progress.emit,
+                             is_cancelled=lambda: self.cancel_requested)
+        except Exception as error:
+            # The filmstrip keeps its placeholders, the screenshots themselves are still shown.
+            print(f"Thumbnails could not be built: {type(error).__name__}: {error}")
+
+    def on_finished(self):
+        if self.pending and not self.cancel_requested:
+            self.start()
+
+
+class Filmstrip(QAbstractScrollArea):
+    scrubbed = pyqtSignal(float)
+    released = pyqtSignal(float)
+
+    def __init__(self, store, aspect_ratio, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.aspect_ratio = aspect_ratio
+        self.times = numpy.array([], dtype=numpy.int64)
+        self.current = -1
+        self.scrubbing = False
+        self.pixmaps = OrderedDict()
+
+        self.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOn)
+        self.horizontalScrollBar().valueChanged.connect(self.viewport().update)
+
+    def set_times(self, times):
+        self.times = times
+        self.update_scroll_range()
+        self.viewport().update()
+
+    def get_cell_size(self):
+        height = max(self.viewport().height() - 2 * FILMSTRIP_SPACING, 1)
+        return max(round(height * self.aspect_ratio), 1) + FILMSTRIP_SPACING, height
+
+    def get_level(self, height):
+        # The smallest thumbnails that are still at least as tall as a cell.
+        levels = [level for level, level_height in enumerate(THUMBNAIL_HEIGHTS) if level_height >= height]
+        return levels[-1] if levels else 0
+
+    def update_scroll_range(self):
+        step, _ = self.get_cell_size()
+        scroll_bar = self.horizontalScrollBar()
+        scroll_bar.setRange(0, max(len(self.times) * step - self.viewport().width(), 0))
+        scroll_bar.setPageStep(self.viewport().width())
+        scroll_bar.setSingleStep(step)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_scroll_range()
+
+    def get_pixmap(self, capture_time, level, height):
+        # Thumbnails are decoded and scaled to the cell once, later paints only draw them.
+        key = capture_time, level, height
+        pixmap = self.pixmaps.get(key)
+        if pixmap is not None:
+            self.pixmaps.move_to_end(key)
+            return pixmap
+        data = self.store.get(capture_time, level)
+        if data is None:
+            return None
+        pixmap = QPixmap()
+        pixmap.loadFromData(data, "JPEG")
+        if height is not None and pixmap.height() != height:
+            pixmap = pixmap.scaledToHeight(height, Qt.TransformationMode.SmoothTransformation)
+        self.pixmaps[key] = pixmap
+        while len(self.pixmaps) > FILMSTRIP_PIXMAP_CACHE_SIZE:
+            self.pixmaps.popitem(last=False)
+        return pixmap
+
+    def get_preview(self, capture_time):
+        return self.get_pixmap(capture_time, 0, None)
+
+    def paintEvent(self, event):
+        # Only the cells in view are drawn, however many screenshots the session has.
+        step, height = self.get_cell_size()
+        level = self.get_level(height)
+        offset = self.horizontalScrollBar().value()
+        first = offset // step
+        last = min(len(self.times), (offset + self.viewport().width()) // step + 1)
+
+        painter = QPainter(self.viewport())
+        for i in range(first, last):
+            cell = QRect(i * step - offset + FILMSTRIP_SPACING // 2, FILMSTRIP_SPACING, step - FILMSTRIP_SPACING, height)
+            pixmap = self.get_pixmap(self.times[i].item(), level, height)
+            if pixmap is None:
+                painter.fillRect(cell, QColor("#DDDDDD"))
+            else:
+                width = min(pixmap.width(), cell.width())
+                painter.drawPixmap(cell.x() + (cell.width() - width) // 2, cell.y(), pixmap,
+                                   (pixmap.width() - width) // 2, 0, width, height)
+            if i == self.current:
+                painter.setPen(QPen(QColor("#FBAF00"), 3))
+                painter.drawRect(cell.adjusted(1, 1, -1, -1))
+        painter.end()
+
+    def get_index_at(self, x):
+        step, _ = self.get_cell_size()
+        return min(max((x + self.horizontalScrollBar().value()) // step, 0), len(self.times) - 1)
+
+    def scrub_to(self, x):
+        idx = self.get_index_at(x)
+        if idx >= 0 and idx != self.current:
+            self.current = idx
+            self.viewport().update()
+            self.scrubbed.emit(float(self.times[idx]))
+
+    def mousePressEvent(self, event):
+        if event.button() != Qt.MouseButton.LeftButton or not len(self.times):
+            return
+        self.scrubbing = True
+        self.current = -1
+        self.scrub_to(int(event.position().x()))
+
+    def mouseMoveEvent(self, event):
+        if self.scrubbing:
+            self.scrub_to(int(event.position().x()))
+
+    def mouseReleaseEvent(self, event):
+        if not self.scrubbing:
+            return
+        self.scrubbing = False
+        idx = self.get_index_at(int(event.position().x()))
+        if idx >= 0:
+            self.released.emit(float(self.times[idx]))
+
+    def wheelEvent(self, event):
+        delta = event.angleDelta().y() or event.angleDelta().x()
+        scroll_bar = self.horizontalScrollBar()
+        scroll_bar.setValue(scroll_bar.value() - delta)
+
+    def set_current(self, capture_time):
+        idx = int(numpy.searchsorted(self.times, capture_time))
+        if idx >= len(self.times) or self.times[idx] != capture_time or self.scrubbing:
+            return
+        self.current = idx
+        # The current screenshot is brought back to the middle once it leaves the view.
+        step, _ = self.get_cell_size()
+        scroll_bar = self.horizontalScrollBar()
+        if not scroll_bar.value() <= idx * step <= scroll_bar.value() + self.viewport().width() - step:
+            scroll_bar.setValue(idx * step - (self.viewport().width() - step) // 2)
+        self.viewport().update()
@@ -0,0 +1,56 @@
+import numpy
+
+FIXATION_COLUMNS = ("from_s", "to_s", "durations", "hr_avg", "hr_change", "hr_max", "hr_min", "view_counts")
+
+
+class FixationTable:
+    def __init__(self, names, object_codes, tag_codes, from_s, to_s, durations, hr_avg, hr_change, hr_max, hr_min,
+                 view_counts):
+        # Code -1 selects the trailing None, which aggregated rows use for a missing object.
+        self.names = list(names) + [None]
+        self.object_codes = numpy.asarray(object_codes, dtype=numpy.int64)
+        self.tag_codes = numpy.asarray(tag_codes, dtype=numpy.int64)
+        self.from_s = numpy.asarray(from_s, dtype=float)
+        self.to_s = numpy.asarray(to_s, dtype=float)
+        self.durations = numpy.asarray(durations, dtype=float)
+        self.hr_avg = numpy.asarray(hr_avg, dtype=float)
+        self.hr_change = numpy.asarray(hr_change, dtype=float)
+        self.hr_max = numpy.asarray(hr_max, dtype=float)
+        self.hr_min = numpy.asarray(hr_min, dtype=float)
+        self.view_counts = numpy.asarray(view_counts, dtype=numpy.int64)
+
+    def __len__(self):
+        return len(self.from_s)
+
+    @property
+    def hr_range(self):
+        return self.hr_max - self.hr_min + 1
+
+    def get_name(self, code):
+        return self.names[code]
+
+    def get_names(self, codes):
+        return numpy.array(["" if name is None else name for name in self.names], dtype=str)[codes]
+
+    def get_objects(self):
+        return self.get_names(self.object_codes)
+
+    def get_tags(self):
+        return self.get_names(self.tag_codes)
+
+    def append(self, table):
+        self.names = table.names
+        self.object_codes = numpy.concatenate((self.object_codes, table.object_codes))
+        self.tag_codes = numpy.concatenate((self.tag_codes, table.tag_codes))
+        for column in FIXATION_COLUMNS:
+            setattr(self, column, numpy.concatenate((getattr(self, column), getattr(table, column))))
+
+    def get_columns(self):
+        return {"object": self.get_objects(), "tag": self.get_tags(), "from_s": self.from_s, "to_s": self.to_s,
+                "duration": self.durations, "hr_avg": self.hr_avg, "hr_change": self.hr_change, "hr_max": self.hr_max,
+                "hr_min": self.hr_min, "hr_range": self.hr_range, "view_count": self.view_counts}
+
+
+def create_empty_fixation_table(names=()):
+    empty = numpy.array([], dtype=float)
+    return FixationTable(names, empty, empty, empty, empty, empty, empty, empty, empty, empty, empty)
@@ -1,37 +1,87 @@
+import os
+from collections import OrderedDict
+
 import numpy
-import numpy as np
 import pyqtgraph
-from PyQt6.QtWidgets import QWidget, QLabel, QVBoxLayout, QSplitter
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QPixmap, QKeyEvent
+from PyQt6.QtWidgets import QWidget, QLabel, QVBoxLayout, QHBoxLayout, QSplitter, QPushButton, QComboBox
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtGui import QKeyEvent, QPixmap
 
 from constants import *
 from basic_functions import *
+from screenshot_cache import ScreenshotCache, ScreenshotScaler
+from playback import Playback
+from thumbnails import ThumbnailStore
+from filmstrip import Filmstrip, ThumbnailBuilder
+from image_index import get_image_name
+from decimation import MinMaxPyramid
+from profiling import profiler, profiled
 
 
 class ScalablePixmapLabel(QLabel):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.original_pixmap = None
+        self.pixmap_key = None
+        self.scaled_pixmaps = OrderedDict()
+        self.resizing = False
         self.setScaledContents(False)
         self.setMinimumSize(1, 1)
 
-    def setPixmap(self, pixmap):
+        # A resize uses the fast transformation and the smooth one follows once the size stops changing.
+        self.settle_timer = QTimer(self)
+        self.settle_timer.setSingleShot(True)
+        self.settle_timer.setInterval(SCALE_SETTLE_INTERVAL_MS)
+        self.settle_timer.timeout.connect(self._settle)
+
+    def setPixmap(self, pixmap, key=None):
         self.original_pixmap = pixmap
+        self.pixmap_key = pixmap.cacheKey() if key is None else key
         self._update_scaled_pixmap()
 
+    def set_scaled_pixmap(self, pixmap):
+        # The pixmap was already scaled to the label size off the GUI thread. It is keyed by itself,
+        # so rescaling it after a resize never stands in for the full-resolution screenshot.
+        self.original_pixmap = pixmap
+        self.pixmap_key = pixmap.cacheKey()
+        super().setPixmap(pixmap)
+
     def resizeEvent(self, event):
         super().resizeEvent(event)
+        self.resizing = True
+        self.settle_timer.start()
         self._update_scaled_pixmap()
 
+    def _settle(self):
+        self.resizing = False
+        self._update_scaled_pixmap()
+
+    def _insert_scaled_pixmap(self, key, pixmap):
+        self.scaled_pixmaps[key] = pixmap
+        self.scaled_pixmaps.move_to_end(key)
+        while len(self.scaled_pixmaps) > SCALED_PIXMAP_CACHE_SIZE:
+            self.scaled_pixmaps.popitem(last=False)
+
     def _update_scaled_pixmap(self):
         if self.original_pixmap is None:
             return
-        scaled = self.original_pixmap.scaled(
-            self.size(),
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
-        )
+        key = (self.pixmap_key, self.width(), self.height())
+        scaled = self.scaled_pixmaps.get(key)
+        if scaled is not None:
+            self.scaled_pixmaps.move_to_end(key)
+        elif self.resizing:
+            scaled = self.original_pixmap.scaled(
+                self.size(),
+                Qt.AspectRatioMode.KeepAspectRatio,
+                Qt.TransformationMode.FastTransformation
+            )
+        else:
+            scaled = self.original_pixmap.scaled(
+                self.size(),
+                Qt.AspectRatioMode.KeepAspectRatio,
+                Qt.TransformationMode.SmoothTransformation
+            )
+            self._insert_scaled_pixmap(key, scaled)
         super().setPixmap(scaled)
 
 
@@ -42,9 +92,17 @@ class GraphTab(QWidget):
         self.filter_options = ("All", "Objects", "Tags")
 
         self.data = data
-        self.start_time = time_to_sec(self.data.start_time)
+        self.start_time = self.data.start_s
 
         self.main_dir = main_dir
+        self.screenshot_cache = ScreenshotCache(self.get_image_path, parent=self)
+        self.screenshot_scaler = ScreenshotScaler(self.get_image_path, parent=self)
+        self.screenshot_scaler.scaled.connect(self.on_screenshot_scaled)
+        self.thumbnail_store = ThumbnailStore(main_dir.get_thumbnail_dir_path())
+        self.thumbnail_builder = ThumbnailBuilder(self.thumbnail_store, main_dir.get_image_dir_path(), self)
+        self.thumbnail_count = None
+        self.requested_capture_time = None
+        self.current_idx = 0
 
         self.layout = QVBoxLayout()
 
@@ -54,10 +112,10 @@ class GraphTab(QWidget):
 
     def keyPressEvent(self, event: QKeyEvent):
         if event.key() == Qt.Key.Key_Left or event.key() == Qt.Key.Key_Right:
-            x = self.vertical_line.getXPos()
-            idx = np.argmax(self.xs == x)
-            idx += 1 if event.key() == Qt.Key.Key_Right else -1
+            idx = self.current_idx + (1 if event.key() == Qt.Key.Key_Right else -1)
             self.change_displayed_time(idx)
+        elif event.key() == Qt.Key.Key_Space:
+            self.toggle_playback()
         else:
             super().keyPressEvent(event)
 
@@ -83,12 +141,16 @@ class GraphTab(QWidget):
 
         self.graph_widget.setMouseEnabled(x=True, y=False)
 
-        self.xs = numpy.array([time_to_sec(t) for t in self.data.hr_data.keys()])
-        self.xs = self.xs - self.start_time
-        self.ys = numpy.array([x if x is not None else 0 for x in self.data.hr_data.values()])
+        self.xs = self.data.hr_series.times
+        self.ys = numpy.nan_to_num(self.data.hr_series.values).astype(int)
 
-        self.graph_widget.plot(self.xs, self.ys, pen=pyqtgraph.mkPen(color="#007CBE", width=3), name="Heart rate")
-        self.graph_widget.setXRange(self.xs[0], self.xs[50])
+        self.hr_pyramid = MinMaxPyramid(self.xs, self.data.hr_series.values)
+        self.hr_curve = self.graph_widget.plot(pen=pyqtgraph.mkPen(color="#007CBE", width=3), name="Heart rate")
+        view_box = self.graph_widget.getViewBox()
+        view_box.sigXRangeChanged.connect(self.update_hr_curve)
+        view_box.sigResized.connect(self.update_hr_curve)
+        self.graph_widget.setXRange(self.xs[0], self.xs[min(50, len(self.xs) - 1)])
+        self.update_hr_curve()
 
         self.vertical_line = pyqtgraph.InfiniteLine(pos=self.xs[0], angle=90, pen=pyqtgraph.mkPen(
                                                 color="#FBAF00", width=3, style=Qt.PenStyle.DashLine))
@@ -96,8 +158,85 @@ class GraphTab(QWidget):
 
         self.add_text_to_graph(graph_layout)
         graph_layout.addWidget(self.graph_widget)
+        self.add_filmstrip(graph_layout)
+        self.add_playback_controls(graph_layout)
         splitter.addWidget(container)
 
+    def add_filmstrip(self, layout):
+        self.filmstrip = Filmstrip(self.thumbnail_store, self.get_screenshot_aspect_ratio())
+        self.filmstrip.setFixedHeight(FILMSTRIP_HEIGHT)
+        self.filmstrip.set_times(self.data.gaze_capture_times)
+        self.filmstrip.scrubbed.connect(self.on_filmstrip_scrubbed)
+        self.filmstrip.released.connect(self.on_filmstrip_released)
+        self.thumbnail_builder.progress.connect(lambda built, total: self.filmstrip.viewport().update())
+        layout.addWidget(self.filmstrip)
+
+    def get_screenshot_aspect_ratio(self):
+        widths, heights = self.data.image_index.widths, self.data.image_index.heights
+        known = heights > 0
+        return numpy.median(widths[known] / heights[known]).item() if known.any() else 16 / 9
+
+    def update_thumbnails(self):
+        # Thumbnails are built once the tab is shown, and again whenever screenshots are added.
+        if self.thumbnail_count != len(self.data.gaze_capture_times):
+            self.thumbnail_count = len(self.data.gaze_capture_times)
+            self.thumbnail_builder.request(self.data.gaze_capture_times)
+
+    def stop_thumbnails(self):
+        self.thumbnail_builder.cancel()
+        self.thumbnail_builder.wait()
+        self.thumbnail_store.close()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.update_thumbnails()
+
+    def add_playback_controls(self, layout):
+        self.playback = Playback(self.xs, self)
+        self.playback.frame_changed.connect(self.show_playback_frame)
+        self.playback.state_changed.connect(self.on_playback_state_changed)
+        self.screenshot_scaler.dropped.connect(self.playback.add_dropped_frames)
+
+        self.play_button = QPushButton("Play")
+        self.play_button.clicked.connect(self.toggle_playback)
+        self.speed_dropdown = QComboBox()
+        self.speed_dropdown.addItems([f"{speed}×" for speed in PLAYBACK_SPEEDS])
+        self.speed_dropdown.currentIndexChanged.connect(lambda index: self.playback.set_speed(PLAYBACK_SPEEDS[index]))
+        self.playback_stats_label = QLabel()
+
+        controls = QHBoxLayout()
+        controls.addWidget(self.play_button)
+        controls.addWidget(self.speed_dropdown)
+        controls.addWidget(self.playback_stats_label)
+        controls.addStretch()
+        layout.addLayout(controls)
+
+    def update_hr_curve(self):
+        view_box = self.graph_widget.getViewBox()
+        x_from, x_to = view_box.viewRange()[0]
+        xs, ys = self.hr_pyramid.get_points(x_from, x_to, max(int(view_box.width()), 1))
+        # Missing HR values stay NaN, so the curve breaks instead of dropping to zero.
+        self.hr_curve.setData(xs, ys, connect="finite")
+
+    def refresh_data(self):
+        following = self.current_idx == len(self.xs) - 1
+        previous_last_x = self.xs[-1]
+        self.xs = self.data.hr_series.times
+        self.ys = numpy.nan_to_num(self.data.hr_series.values).astype(int)
+        self.hr_pyramid = MinMaxPyramid(self.xs, self.data.hr_series.values)
+        self.playback.set_times(self.xs)
+        self.filmstrip.set_times(self.data.gaze_capture_times)
+        if self.isVisible():
+            self.update_thumbnails()
+
+        x_from, x_to = self.graph_widget.getViewBox().viewRange()[0]
+        if x_from <= previous_last_x <= x_to < self.xs[-1]:
+            self.graph_widget.setXRange(self.xs[-1] - (x_to - x_from), self.xs[-1], padding=0)
+        else:
+            self.update_hr_curve()
+        if following and self.current_idx != len(self.xs) - 1:
+            self.change_displayed_time(len(self.xs) - 1)
+
     def setup_graph_tab(self):
         splitter = QSplitter(Qt.Orientation.Horizontal)
 
@@ -115,37 +254,104 @@ class GraphTab(QWidget):
         self.setLayout(self.layout)
         self.graph_widget.scene().sigMouseClicked.connect(self.graph_click_event)
 
-    def create_pixmap(self, image_name):
-        pixmap = QPixmap(f"{self.main_dir.get_image_dir_path()}\\{image_name}{FILE_EXTENSION}")
-        return pixmap
-
-    def find_screenshot_for_x_pos(self, x):
-        real_gaze_time = x + self.start_time
+    def get_image_path(self, gaze_capture_time):
+        return os.path.join(self.main_dir.get_image_dir_path(), f"{get_image_name(gaze_capture_time)}{FILE_EXTENSION}")
 
-        diff_array = numpy.abs(self.data.gaze_capture_times - real_gaze_time)
-        time_idx = diff_array.argmin()
-        gaze_capture_time = self.data.gaze_capture_times[time_idx]
+    def find_capture_times_for_x_pos(self, xs):
+        return self.data.get_nearest_capture_times(xs + self.start_time)
 
-        image_name = self.data.get_image_name_from_seconds(gaze_capture_time)
-        return self.create_pixmap(image_name)
+    def prefetch_neighbour_screenshots(self, idx):
+        neighbours = list()
+        for step in range(1, SCREENSHOT_PREFETCH_COUNT + 1):
+            neighbours += [i for i in (idx + step, idx - step) if 0 <= i < len(self.xs)]
+        self.screenshot_cache.prefetch(self.find_capture_times_for_x_pos(self.xs[neighbours]).tolist())
 
     def graph_click_event(self, event):
         graph_point = self.graph_widget.plotItem.vb.mapSceneToView(event.scenePos())
-        x = graph_point.x()
-        diff_array = numpy.abs(self.xs - x)
-        idx = diff_array.argmin()
-        self.change_displayed_time(idx)
+        idx = find_nearest_index(self.xs, graph_point.x())
+        self.change_displayed_time(int(idx))
 
+    @profiled("GraphTab.change_displayed_time", "graph")
     def change_displayed_time(self, idx):
         if idx >= len(self.xs) or idx < 0:
             return
-        graph_x = self.xs[idx]
-        pixmap = self.find_screenshot_for_x_pos(graph_x)
-        self.image_label.setPixmap(pixmap)
-
-        self.vertical_line.setPos(graph_x)
+        self.playback.seek(idx)
+        self.show_frame(idx)
 
-        self.info_label.setText(self.create_info_label_text(sec_to_time(graph_x), self.ys[idx], self.data.get_object_at_time(graph_x)))
+    def show_frame(self, idx, preview=False):
+        self.current_idx = idx
+        graph_x = self.xs[idx]
+        with profiler.span("GraphTab: lookup", "graph"):
+            capture_time = self.find_capture_times_for_x_pos(graph_x).item()
+            obj = self.data.get_object_at_time(graph_x)
+        if preview:
+            self.show_preview(capture_time)
+        elif self.playback.is_playing():
+            # During playback the screenshot is decoded and scaled off the GUI thread, and late frames are dropped.
+            self.request_scaled_screenshot(capture_time)
+        else:
+            with profiler.span("GraphTab: decode", "graph"):
+                pixmap = self.screenshot_cache.get(capture_time)
+            with profiler.span("GraphTab: scale", "graph"):
+                self.image_label.setPixmap(pixmap, capture_time)
+
+        with profiler.span("GraphTab: label update", "graph"):
+            self.vertical_line.setPos(graph_x)
+            self.info_label.setText(self.create_info_label_text(sec_to_time(graph_x), self.ys[idx], obj))
+            self.filmstrip.set_current(capture_time)
+
+        if not self.playback.is_playing() and not preview:
+            self.prefetch_neighbour_screenshots(idx)
+
+    def request_scaled_screenshot(self, capture_time):
+        if capture_time != self.requested_capture_time:
+            self.requested_capture_time = capture_time
+            self.screenshot_scaler.request(capture_time, self.image_label.size())
+
+    def show_preview(self, capture_time):
+        # While scrubbing the filmstrip its preview thumbnail stands in for the screenshot.
+        pixmap = self.filmstrip.get_preview(capture_time)
+        if pixmap is None:
+            self.request_scaled_screenshot(capture_time)
+        else:
+            self.requested_capture_time = None
+            self.image_label.setPixmap(pixmap, ("thumbnail", capture_time))
+
+    def on_filmstrip_scrubbed(self, capture_time):
+        self.playback.stop()
+        idx = int(find_nearest_index(self.xs, capture_time - self.start_time))
+        self.playback.seek(idx)
+        self.show_frame(idx, preview=True)
+
+    def on_filmstrip_released(self, capture_time):
+        self.requested_capture_time = None
+        self.screenshot_scaler.clear()
+        self.change_displayed_time(int(find_nearest_index(self.xs, capture_time - self.start_time)))
+
+    @profiled("GraphTab.show_playback_frame", "graph")
+    def show_playback_frame(self, idx):
+        self.show_frame(idx)
+        self.playback_stats_label.setText(f"{self.playback.get_fps():.1f} fps, {self.playback.dropped_frames} dropped")
+
+    def on_screenshot_scaled(self, capture_time, image):
+        # Results are shown for as long as screenshots are requested, also those overtaken by a newer request.
+        if self.requested_capture_time is not None:
+            self.image_label.set_scaled_pixmap(QPixmap.fromImage(image))
+
+    def toggle_playback(self):
+        if self.playback.is_playing():
+            self.playback.stop()
+            return
+        if self.current_idx >= len(self.xs) - 1:
+            self.change_displayed_time(0)
+        self.playback.start(self.current_idx)
+
+    def on_playback_state_changed(self, playing):
+        self.play_button.setText("Pause" if playing else "Play")
+        if not playing:
+            self.requested_capture_time = None
+            self.screenshot_scaler.clear()
+            self.show_frame(self.current_idx)
 
 
 class TimeAxisItem(pyqtgraph.AxisItem):
@@ -0,0 +1,188 @@
+import numpy
+
+from constants import *
+
+
+def estimate_log_interval(times, report=True):
+    # The median step between samples, so that gaps and repeated ticks at the start do not decide it.
+    steps = numpy.diff(times)
+    steps = steps[steps > 0]
+    if not len(steps):
+        return 1.0
+    interval = numpy.median(steps).item()
+    irregular = numpy.count_nonzero(numpy.abs(steps - interval) > interval / 2)
+    if irregular and report:
+        print(f"HR data times are inconsistent in {irregular} of {len(steps)} steps. (Using hr time interval {interval}.)")
+    return interval
+
+
+def get_cumulative_sums(values):
+    return numpy.concatenate(([0.0], numpy.cumsum(values)))
+
+
+class HeartRateBaseline:
+    # "session" is the mean HR of the whole session, "preceding" the mean of the window_s seconds before each
+    # fixation and "calibration" the mean of the first window_s seconds of the session.
+    def __init__(self, method=HR_BASELINE_METHODS[0], window_s=None):
+        if method not in HR_BASELINE_METHODS:
+            raise ValueError(f"Unknown HR baseline '{method}'.")
+        self.method = method
+        self.window_s = HR_BASELINE_WINDOWS.get(method) if window_s is None else window_s
+
+    def __eq__(self, other):
+        return isinstance(other, HeartRateBaseline) and (self.method, self.window_s) == (other.method, other.window_s)
+
+    def get_values(self, series, session_baseline, times):
+        if self.method == "session":
+            return session_baseline
+        if self.method == "calibration":
+            return series.get_window_stats(numpy.zeros(1), numpy.full(1, float(self.window_s)))[0][0]
+        return series.get_preceding_means(times, self.window_s)
+
+
+class RollingHeartRate:
+    def __init__(self, times, values, means, slopes):
+        self.times = times
+        self.values = values
+        self.means = means
+        self.slopes = slopes
+
+    def __len__(self):
+        return len(self.times)
+
+    def get_columns(self):
+        return {"time_s": self.times, "hr": self.values, "hr_rolling_mean": self.means, "hr_rolling_slope": self.slopes}
+
+
+class HeartRateSeries:
+    def __init__(self, times, values, log_interval):
+        times = numpy.asarray(times, dtype=float)
+        values = numpy.asarray(values, dtype=float)
+        order = numpy.argsort(times, kind="stable")
+
+        self.times = times[order]
+        self.values = values[order]
+        self.log_interval = log_interval
+        self.size = len(self.times)
+
+        self.valid = ~numpy.isnan(self.values)
+        # Each sample covers the log interval centred on its timestamp.
+        self.edges = self.times + log_interval / 2
+        self.half_interval = log_interval // 2
+
+        self.padded_values = numpy.append(self.values, numpy.nan)
+        self.padded_valid = numpy.append(self.valid, False)
+        self.cumulative_values = numpy.concatenate(([0.0], numpy.cumsum(numpy.where(self.valid, self.values, 0))))
+        self.cumulative_invalid = numpy.concatenate(([0], numpy.cumsum(~self.valid)))
+
+        indices = numpy.where(self.valid, numpy.arange(self.size), self.size)
+        self.next_valid = numpy.append(numpy.minimum.accumulate(indices[::-1])[::-1], self.size)
+        self.rolling = dict()
+
+    def get_rolling(self, window_s):
+        # Mean and slope (HR per second) of the valid samples in the window_s seconds up to each sample,
+        # the sample itself included and the one exactly window_s seconds before it not.
+        if window_s not in self.rolling:
+            self.rolling[window_s] = self.compute_rolling(window_s)
+        return self.rolling[window_s]
+
+    def compute_rolling(self, window_s):
+        starts = numpy.searchsorted(self.times, self.times - window_s, side="right")
+        ends = numpy.arange(1, self.size + 1)
+        # Times are taken from the first sample, so the sums of squares stay small enough to subtract.
+        times = self.times - self.times[0] if self.size else self.times
+        values = numpy.where(self.valid, self.values, 0)
+        weights = self.valid.astype(float)
+
+        sums = [get_cumulative_sums(column) for column in (weights, weights * times, values, weights * times * times,
+                                                             values * times)]
+        count, time_sum, value_sum, time_square_sum, product_sum = [column[ends] - column[starts] for column in sums]
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            mean = value_sum / count
+            slope = (count * product_sum - time_sum * value_sum) / (count * time_square_sum - time_sum * time_sum)
+        slope[count < 2] = numpy.nan
+        return mean, slope
+
+    def get_rolling_table(self, window_s):
+        return RollingHeartRate(self.times, self.values, *self.get_rolling(window_s))
+
+    def get_preceding_means(self, times, window_s):
+        # The mean HR of the window_s seconds up to each time, weighted like the HR of a fixation.
+        times = numpy.asarray(times, dtype=float)
+        means = self.get_window_stats(times - window_s, times)[0]
+        # A window without a single sample, inside a gap of the HR log, has no baseline.
+        counts = numpy.searchsorted(self.times, times, side="left") - numpy.searchsorted(self.times, times - window_s)
+        means[counts == 0] = numpy.nan
+        return means
+
+    def count_invalid(self, start, end):
+        return self.cumulative_invalid[end] - self.cumulative_invalid[start]
+
+    def get_window_bounds(self, time_from_s, time_to_s):
+        time_from_s = numpy.maximum(numpy.asarray(time_from_s, dtype=float), 0)
+        time_to_s = numpy.asarray(time_to_s, dtype=float)
+        n = self.size
+
+        first_idx = self.next_valid[numpy.searchsorted(self.edges, time_from_s, side="right")]
+        end_idx = numpy.searchsorted(self.edges, time_to_s, side="left")
+        point = time_to_s - time_from_s == 0
+
+        last_idx = numpy.where(point, first_idx, numpy.maximum(end_idx, first_idx + 1))
+        has_end = ~point & (last_idx < n)
+
+        # A missing sample reached before the window is closed voids the whole window.
+        empty = first_idx >= n
+        empty |= self.count_invalid(numpy.minimum(end_idx, first_idx), first_idx) > 0
+        empty |= has_end & ~self.padded_valid[numpy.minimum(last_idx, n)]
+        last_idx = numpy.where(has_end | point, last_idx, n - 1)
+        return time_from_s, time_to_s, first_idx, last_idx, has_end, point, empty
+
+    def get_window_weights(self, time_from_s, time_to_s):
+        time_from_s, time_to_s, first_idx, last_idx, has_end, point, empty = self.get_window_bounds(time_from_s, time_to_s)
+        first_idx = numpy.where(empty, 0, first_idx)
+        last_idx = numpy.where(empty, 0, last_idx)
+        start_weight = numpy.where(point, 1, self.times[first_idx] + self.half_interval - time_from_s)
+        end_weight = numpy.where(has_end, self.log_interval - (self.times[last_idx] + self.half_interval - time_to_s), 0)
+        return first_idx, last_idx, start_weight, end_weight, has_end, point, empty
+
+    def get_window(self, time_from_s, time_to_s):
+        first_idx, last_idx, start_weight, end_weight, has_end, point, empty = self.get_window_weights(time_from_s, time_to_s)
+        if empty:
+            return []
+        first_idx, last_idx = int(first_idx), int(last_idx)
+        hr_list = [(self.values[first_idx], start_weight.item())]
+        if point:
+            return hr_list
+        middle_end = last_idx if has_end else last_idx + 1
+        for idx in range(first_idx + 1, middle_end):
+            if self.valid[idx]:
+                hr_list.append((self.values[idx], self.log_interval))
+        if has_end:
+            hr_list.append((self.values[last_idx], end_weight.item()))
+        return hr_list
+
+    def get_window_stats(self, time_from_s, time_to_s):
+        first_idx, last_idx, start_weight, end_weight, has_end, point, empty = self.get_window_weights(time_from_s, time_to_s)
+        middle_end = numpy.where(has_end, last_idx, last_idx + 1)
+        middle_start = numpy.minimum(first_idx + 1, middle_end)
+
+        middle_count = (middle_end - middle_start) - self.count_invalid(middle_start, middle_end)
+        middle_sum = self.cumulative_values[middle_end] - self.cumulative_values[middle_start]
+
+        first_values = self.padded_values[first_idx]
+        last_values = numpy.where(has_end, self.padded_values[last_idx], 0)
+        hr_sum = first_values * start_weight + self.log_interval * middle_sum + last_values * end_weight
+        hr_time = start_weight + self.log_interval * middle_count + end_weight
+
+        bounds = numpy.empty(2 * len(first_idx), dtype=numpy.intp)
+        bounds[0::2] = first_idx
+        bounds[1::2] = last_idx + 1
+        hr_max = numpy.fmax.reduceat(self.padded_values, bounds)[0::2]
+        hr_min = numpy.fmin.reduceat(self.padded_values, bounds)[0::2]
+
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            hr_avg = numpy.where(point, first_values, hr_sum / hr_time)
+        hr_avg[empty | (hr_time == 0)] = numpy.nan
+        hr_max[empty] = numpy.nan
+        hr_min[empty] = numpy.nan
+        return hr_avg, hr_max, hr_min
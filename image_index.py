@@ -0,0 +1,100 @@
+import os
+import struct
+
+import numpy
+
+from constants import *
+
+JPEG_START = b"\xff\xd8"
+# Start-of-frame markers carry the image size; C4, C8 and CC share the range but are not frames.
+JPEG_FRAME_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+JPEG_STANDALONE_MARKERS = frozenset(range(0xD0, 0xD8)) | {0x01, 0xD8}
+
+
+def read_jpeg_size(path):
+    try:
+        with open(path, 'rb') as file:
+            if file.read(2) != JPEG_START:
+                return 0, 0
+            while True:
+                marker = file.read(2)
+                if len(marker) < 2 or marker[0] != 0xFF:
+                    return 0, 0
+                code = marker[1]
+                while code == 0xFF:
+                    code = file.read(1)[0]
+                if code in JPEG_STANDALONE_MARKERS:
+                    continue
+                length, = struct.unpack(">H", file.read(2))
+                if code in JPEG_FRAME_MARKERS:
+                    height, width = struct.unpack(">xHH", file.read(5))
+                    return width, height
+                file.seek(length - 2, os.SEEK_CUR)
+    except (OSError, IndexError, struct.error):
+        return 0, 0
+
+
+def parse_capture_time(name):
+    if len(name) != 6 or not name.isascii() or not name.isdigit():
+        return None
+    hours, minutes, seconds = int(name[0:2]), int(name[2:4]), int(name[4:6])
+    if hours > 23 or minutes > 59 or seconds > 59:
+        return None
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def get_image_name(capture_time):
+    hours, rest = divmod(capture_time % DAY_SECONDS, 3600)
+    return f"{hours:02}{rest // 60:02}{rest % 60:02}"
+
+
+class ImageIndex:
+    def __init__(self, capture_times, widths, heights):
+        capture_times = numpy.asarray(capture_times, dtype=numpy.int64)
+        order = numpy.argsort(capture_times, kind="stable")
+        # Capture times are times of day, taken from the screenshot names.
+        self.capture_times = capture_times[order]
+        self.widths = numpy.asarray(widths, dtype=numpy.int32)[order]
+        self.heights = numpy.asarray(heights, dtype=numpy.int32)[order]
+
+    def __len__(self):
+        return len(self.capture_times)
+
+    def get_size(self, capture_time):
+        idx = numpy.searchsorted(self.capture_times, capture_time % DAY_SECONDS)
+        if idx == len(self.capture_times) or self.capture_times[idx] != capture_time % DAY_SECONDS:
+            return None
+        return self.widths[idx].item(), self.heights[idx].item()
+
+    def get_arrays(self):
+        return {"image_times": self.capture_times, "image_widths": self.widths, "image_heights": self.heights}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays["image_times"], arrays["image_widths"], arrays["image_heights"])
+
+
+def scan_image_dir(path, previous=None):
+    # Sizes already known from a previous scan are kept, so only new screenshots have their header read.
+    capture_times, widths, heights = list(), list(), list()
+    known_sizes = dict()
+    if previous is not None:
+        known_sizes = dict(zip(previous.capture_times.tolist(), zip(previous.widths.tolist(), previous.heights.tolist())))
+    try:
+        entries = os.scandir(path)
+    except OSError:
+        return ImageIndex(capture_times, widths, heights)
+    with entries:
+        for entry in entries:
+            if not entry.name.endswith(FILE_EXTENSION):
+                continue
+            capture_time = parse_capture_time(entry.name[:-len(FILE_EXTENSION)])
+            if capture_time is None:
+                continue
+            size = known_sizes.get(capture_time)
+            if size is None or size[0] == 0:
+                size = read_jpeg_size(entry.path)
+            capture_times.append(capture_time)
+            widths.append(size[0])
+            heights.append(size[1])
+    return ImageIndex(capture_times, widths, heights)
@@ -0,0 +1,201 @@
+import os
+
+import numpy
+
+from constants import *
+from basic_functions import *
+from csv_loader import *
+from session_dir import MainDirClass
+from data_processing import DataClass
+from noise_filter import NoiseFilter
+from fixation_table import create_empty_fixation_table
+from image_index import ImageIndex, scan_image_dir
+from heart_rate import HeartRateBaseline
+
+
+class LiveDataClass(DataClass):
+    def __init__(self, main_dir: MainDirClass):
+        self.main_dir = main_dir
+        self.hr_baseline_method = HeartRateBaseline()
+        self.text_tail = FileTail(main_dir.get_text_data_path())
+        self.hr_tail = FileTail(main_dir.get_hr_data_path())
+        self.noise_filter = NoiseFilter()
+        self.image_dir_mtime = None
+
+        self.hr_clock_times = numpy.array([], dtype=float)
+        self.hr_times = numpy.array([], dtype=float)
+        self.hr_values = numpy.array([], dtype=float)
+        self.hr_log_interval = None
+        self.hr_interval_final = False
+        self.hr_baseline = None
+        self.hr_series = None
+        self.image_index = ImageIndex([], [], [])
+        self.gaze_capture_times = numpy.array([], dtype=numpy.int64)
+        self.first_text_s = None
+        self.last_text_s = None
+        self.start_s = None
+        self.start_time = None
+
+        self.names = list()
+        self.name_codes = dict()
+        self.waiting_records = list()
+        self.object_columns = {"names": numpy.array([], dtype=str),
+                               "object_codes": numpy.array([], dtype=numpy.int64),
+                               "tag_codes": numpy.array([], dtype=numpy.int64),
+                               "from_s": numpy.array([], dtype=float), "to_s": numpy.array([], dtype=float),
+                               "hr_avg": numpy.array([], dtype=float), "hr_max": numpy.array([], dtype=float),
+                               "hr_min": numpy.array([], dtype=float)}
+        self.object_data = create_empty_fixation_table()
+        self.object_starts = numpy.array([], dtype=float)
+        self.object_ends = numpy.array([], dtype=float)
+        self.aggregated_data = dict()
+        self.event_responses = dict()
+
+    def is_ready(self):
+        return self.hr_series is not None and len(self.gaze_capture_times) > 0
+
+    def poll(self):
+        hr_changed = self.poll_heart_rate()
+        images_changed = self.poll_images()
+        self.poll_text()
+        if self.start_s is None and not self.start_session():
+            return False
+        if hr_changed or self.hr_series is None:
+            interval_changed = self.hr_series is not None and self.hr_series.log_interval != self.hr_log_interval
+            self.hr_series = self.create_hr_series()
+            if interval_changed:
+                self.update_hr_stats()
+            elif self.hr_baseline_method.method != "preceding":
+                self.update_hr_changes()
+
+        added = self.aggregate_waiting_records()
+        if hr_changed or added:
+            self.aggregated_data = dict()
+            self.event_responses = dict()
+        return hr_changed or images_changed or added > 0
+
+    def poll_heart_rate(self):
+        chunk = self.hr_tail.read_rows()
+        if not chunk:
+            return False
+        hr_columns = parse_heart_rate_chunk(chunk)
+        report_skipped_rows(self.hr_tail.path, hr_columns.skipped)
+        if not len(hr_columns):
+            return False
+
+        # The first rows of either log are put on the same day as the other log, if it has already started.
+        last_s = self.get_last_hr_clock_time()
+        times = unwrap_day_times(hr_columns.times, self.last_text_s if last_s is None else last_s)
+        self.hr_clock_times = numpy.concatenate((self.hr_clock_times, times))
+        # The last tick may still receive samples, so duplicates are spread again on every poll.
+        self.hr_times = spread_duplicate_times(self.hr_clock_times)
+        self.hr_values = numpy.concatenate((self.hr_values, hr_columns.values))
+
+        if not self.hr_interval_final and len(self.hr_times) >= 3:
+            # Estimated again on every poll until enough steps have arrived, so a gap at the start does not decide it.
+            self.hr_interval_final = len(self.hr_times) > LIVE_HR_INTERVAL_STEPS
+            self.hr_log_interval = self.calculate_hr_log_interval(report=self.hr_interval_final)
+        if not numpy.isnan(self.hr_values).all():
+            self.hr_baseline = self.calculate_hr_baseline()
+        return True
+
+    def poll_images(self):
+        try:
+            mtime = os.stat(self.main_dir.get_image_dir_path()).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self.image_dir_mtime:
+            return False
+        self.image_dir_mtime = mtime
+        self.image_index = scan_image_dir(self.main_dir.get_image_dir_path(), self.image_index)
+        if self.start_s is not None:
+            self.gaze_capture_times = self.place_capture_times(self.image_index.capture_times)
+        return True
+
+    def poll_text(self):
+        chunk = self.text_tail.read_rows()
+        if not chunk:
+            return
+        text_columns = parse_text_chunk(chunk)
+        report_skipped_rows(self.text_tail.path, text_columns.skipped)
+        previous_s = self.get_last_hr_clock_time() if self.last_text_s is None else self.last_text_s
+        text_columns.from_s, text_columns.to_s = unwrap_interval_times(text_columns.from_s, text_columns.to_s, previous_s)
+        records = text_columns.to_records()
+        if not records:
+            return
+
+        if self.first_text_s is None:
+            self.first_text_s = records[0][2]
+        self.last_text_s = records[-1][3]
+        for record in records:
+            self.waiting_records += self.noise_filter.push(record)
+
+    def start_session(self):
+        if self.first_text_s is None or self.hr_log_interval is None:
+            return False
+        self.start_s = min(self.hr_times.min().item(), self.first_text_s)
+        self.start_time = sec_to_time(self.start_s)
+        self.gaze_capture_times = self.place_capture_times(self.image_index.capture_times)
+        return True
+
+    def update_hr_stats(self):
+        # The fixations already added were weighted with the previous log interval.
+        columns = self.object_columns
+        if len(columns["from_s"]):
+            columns["hr_avg"], columns["hr_max"], columns["hr_min"] = self.get_heart_rate_stats(columns["from_s"],
+                                                                                               columns["to_s"])
+            self.object_data = self.create_object_data(columns)
+
+    def update_hr_changes(self):
+        # The session and calibration baselines move as HR arrives, and ΔHR of the fixations already added with them.
+        object_data = self.create_object_data(self.object_columns)
+        if not numpy.array_equal(object_data.hr_change, self.object_data.hr_change, equal_nan=True):
+            self.object_data = object_data
+
+    def get_last_hr_clock_time(self):
+        return self.hr_clock_times[-1].item() if len(self.hr_clock_times) else None
+
+    def aggregate_waiting_records(self):
+        # HR statistics of a fixation are final once the HR log has passed its end,
+        # unless the HR log falls so far behind that it is treated as missing.
+        covered_s = max(self.hr_times.max() - self.hr_log_interval, self.last_text_s - LIVE_HR_MAX_DELAY)
+        ready = 0
+        while ready < len(self.waiting_records) and self.waiting_records[ready][3] <= covered_s:
+            ready += 1
+        if not ready:
+            return 0
+        records = self.waiting_records[:ready]
+        self.waiting_records = self.waiting_records[ready:]
+        return self.append_object_records(records)
+
+    def get_name_code(self, name):
+        if name not in self.name_codes:
+            self.name_codes[name] = len(self.names)
+            self.names.append(name)
+        return self.name_codes[name]
+
+    def append_object_records(self, records):
+        froms_s = numpy.array([record[2] for record in records], dtype=float) - self.start_s
+        tos_s = numpy.array([record[3] for record in records], dtype=float) - self.start_s
+        keep = (froms_s.astype(int) != 0) | (tos_s.astype(int) != 0)
+        object_codes = numpy.array([self.get_name_code(record[0]) for record in records], dtype=numpy.int64)
+        tag_codes = numpy.array([self.get_name_code(record[1]) for record in records], dtype=numpy.int64)
+
+        froms_s, tos_s = froms_s[keep], tos_s[keep]
+        hr_avgs, hr_maxs, hr_mins = self.get_heart_rate_stats(froms_s, tos_s)
+        new_columns = {"names": numpy.array(self.names, dtype=str), "object_codes": object_codes[keep],
+                       "tag_codes": tag_codes[keep], "from_s": froms_s, "to_s": tos_s,
+                       "hr_avg": hr_avgs, "hr_max": hr_maxs, "hr_min": hr_mins}
+        self.object_data.append(self.create_object_data(new_columns))
+
+        for key in OBJECT_COLUMNS:
+            if key != "names":
+                new_columns[key] = numpy.concatenate((self.object_columns[key], new_columns[key]))
+        self.object_columns = new_columns
+
+        ends = tos_s
+        if len(self.object_ends):
+            ends = numpy.maximum(ends, self.object_ends[-1])
+        self.object_starts = numpy.concatenate((self.object_starts, froms_s))
+        self.object_ends = numpy.concatenate((self.object_ends, numpy.maximum.accumulate(ends) if len(ends) else ends))
+        return len(froms_s)
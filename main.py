@@ -1,8 +1,16 @@
+import os
 import sys
-from PyQt6.QtWidgets import QApplication, QTabWidget, QMainWindow, QFileDialog
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import (QApplication, QWidget, QLabel, QPushButton, QGridLayout, QFileDialog,
+                             QProgressBar)
 
-from table_tab import *
-from data_processing import *
+from constants import *
+from session_dir import *
+from deferred_imports import ModuleLoader, print_import_times
+from profiling import profiler
+
+# Only Qt widgets and the session folder helpers are imported before the picker is shown.
+# NumPy, pyqtgraph and the processing modules are imported by ModuleLoader meanwhile.
 
 
 class FolderPickerApp(QWidget):
@@ -10,6 +18,12 @@ class FolderPickerApp(QWidget):
         super().__init__()
 
         self.main_dir = MainDirClass()
+        self.loader = None
+        self.live_data = None
+        self.live_timer = QTimer(self)
+        self.live_timer.timeout.connect(self.poll_live_session)
+        self.module_loader = ModuleLoader(parent=self)
+        self.module_loader.failed.connect(self.on_module_import_failed)
 
         self.folder_label = QLabel("No folder selected", self)
         self.folder_label.setWordWrap(True)
@@ -21,18 +35,49 @@ class FolderPickerApp(QWidget):
 
         self.choose_button = QPushButton("Select Folder", self)
         self.open_button = QPushButton("Open", self)
+        self.live_button = QPushButton("Open Live", self)
+        self.compare_button = QPushButton("Compare Sessions", self)
+        self.cancel_button = QPushButton("Cancel", self)
         self.choose_button.clicked.connect(self.open_folder_dialog)
         self.open_button.clicked.connect(self.open_main_window)
+        self.live_button.clicked.connect(self.open_live_window)
+        self.compare_button.clicked.connect(self.open_workspace_window)
+        self.cancel_button.clicked.connect(self.cancel_loading)
+
+        self.progress_bar = QProgressBar(self)
+        self.progress_bar.setRange(0, 100)
 
         layout = QGridLayout()
         layout.addWidget(self.folder_label, 0, 0, 1, 2)
         layout.addWidget(self.warning_label, 1, 0, 1, 2)
         layout.addWidget(self.open_button, 2, 1)
         layout.addWidget(self.choose_button, 2, 0)
+        layout.addWidget(self.compare_button, 3, 0)
+        layout.addWidget(self.live_button, 3, 1)
+        layout.addWidget(self.progress_bar, 4, 0)
+        layout.addWidget(self.cancel_button, 4, 1)
         self.setLayout(layout)
+        self.set_loading(False)
 
         self.setWindowTitle("Folder Picker")
         self.setGeometry(200, 200, 400, 200)
+        self.module_loader.start()
+
+    def wait_for_modules(self):
+        # Returns at once unless a button is pressed before the background imports are done.
+        self.module_loader.wait()
+        if self.module_loader.error is not None:
+            self.on_module_import_failed(self.module_loader.error)
+            return False
+        return True
+
+    def on_module_import_failed(self, message):
+        # Nothing can be opened without the processing modules, so only choosing a folder stays possible.
+        self.set_loading(False)
+        self.open_button.setEnabled(False)
+        self.live_button.setEnabled(False)
+        self.compare_button.setEnabled(False)
+        self.warning_label.setText(f"Import failed:\n{message}")
 
     def update_label_text(self, path):
         if path:
@@ -49,10 +94,7 @@ class FolderPickerApp(QWidget):
         if not os.path.exists(path) or not os.path.isdir(path):
             self.warning_label.setText(f"Wrong directory:\nThe dir '{path}' does not exist!")
             return False
-        if (not os.path.exists(f"{path}\\{self.main_dir.data_file_name}") or
-                not os.path.exists(f"{path}\\{self.main_dir.images_dir_name}") or
-                not os.path.exists(f"{path}\\{self.main_dir.hr_data_file_name}") or
-                not os.path.isdir(f"{path}\\{self.main_dir.images_dir_name}")):
+        if not is_session_dir(path, self.main_dir):
             self.warning_label.setText(f"Wrong directory:\nNecessary file or directory in '{path}' is missing!")
             return False
         return True
@@ -61,41 +103,142 @@ class FolderPickerApp(QWidget):
         if self.main_dir.folder is None or not self.check_necessary_files(self.main_dir.get_folder_path()):
             return
         self.main_dir.save_last_path()
-        data = DataClass(self.main_dir)
-        self.main_window = MainWindow(data, self.main_dir)
-        self.main_window.show()
-        self.close()
-
-
-class MainWindow(QMainWindow):
-    def __init__(self, data, main_dir):
-        super().__init__()
-
-        self.data = data
-
-        self.main_dir = main_dir
-
-        self.tabs = QTabWidget()
-        self.setCentralWidget(self.tabs)
+        self.warning_label.setText("")
+        self.set_loading(True)
+        if not self.wait_for_modules():
+            return
+        from session_loader import SessionLoader
 
-        self.graph_tab = GraphTab(data, main_dir)
-        self.table_tab = TableTab(data, main_dir)
+        self.loader = SessionLoader(self.main_dir, self)
+        self.loader.progress.connect(self.on_loading_progress)
+        self.loader.loaded.connect(self.on_session_loaded)
+        self.loader.failed.connect(self.on_loading_failed)
+        self.loader.cancelled.connect(self.on_loading_cancelled)
+        self.loader.start()
 
-        self.tabs.addTab(self.graph_tab, "Graph")
-        self.tabs.addTab(self.table_tab, "Table")
+    def open_live_window(self):
+        if self.main_dir.folder is None or not self.check_necessary_files(self.main_dir.get_folder_path()):
+            return
+        self.main_dir.save_last_path()
+        self.warning_label.setText("")
+        self.set_loading(True)
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.setFormat("Waiting for session data...")
+        if not self.wait_for_modules():
+            return
+        from live_session import LiveDataClass
 
-        self.setWindowTitle("Eyetracking and heart rate data visualizer")
-        self.setGeometry(100, 100, 1200, 600)
+        self.live_data = LiveDataClass(self.main_dir)
+        self.live_timer.start(LIVE_REFRESH_INTERVAL_MS)
+        self.poll_live_session()
 
-        self.tabs.currentChanged.connect(self.on_tab_changed)
-        self.on_tab_changed(0)
+    def poll_live_session(self):
+        self.live_data.poll()
+        if not self.live_data.is_ready():
+            return
+        self.live_timer.stop()
+        from main_window import MainWindow
+        self.main_window = MainWindow(self.live_data, self.main_dir)
+        self.main_window.show()
+        self.close()
 
-    def on_tab_changed(self, index):
-        widget = self.tabs.widget(index)
-        widget.setFocus()
+    def open_workspace_window(self):
+        folder_path = QFileDialog.getExistingDirectory(self, "Select a Folder with Sessions", self.main_dir.last_path)
+        if not folder_path:
+            return
+        session_dirs = find_session_dirs([folder_path])
+        if not session_dirs:
+            self.warning_label.setText(f"Wrong directory:\nNo session folders were found in '{folder_path}'!")
+            return
+        self.warning_label.setText("")
+        self.set_loading(True)
+        if not self.wait_for_modules():
+            return
+        from workspace_window import WorkspaceLoader
+
+        self.loader = WorkspaceLoader(session_dirs, self)
+        self.loader.progress.connect(self.on_workspace_progress)
+        self.loader.loaded.connect(self.on_workspace_loaded)
+        self.loader.failed.connect(self.on_loading_failed)
+        self.loader.cancelled.connect(self.on_loading_cancelled)
+        self.loader.start()
+
+    def on_workspace_progress(self, loaded, total):
+        self.progress_bar.setValue(100 * loaded // total)
+        self.progress_bar.setFormat(f"Loaded {loaded} of {total} sessions... %p%")
+
+    def on_workspace_loaded(self, workspace):
+        self.loader.wait()
+        self.loader = None
+        from workspace_window import WorkspaceWindow
+        self.main_window = WorkspaceWindow(workspace)
+        self.main_window.show()
+        self.close()
 
+    def set_loading(self, loading):
+        self.open_button.setEnabled(not loading)
+        self.live_button.setEnabled(not loading)
+        self.compare_button.setEnabled(not loading)
+        self.choose_button.setEnabled(not loading)
+        self.progress_bar.setVisible(loading)
+        self.cancel_button.setVisible(loading)
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setFormat("%p%")
+
+    def cancel_loading(self):
+        if self.live_data is not None:
+            self.live_timer.stop()
+            self.live_data = None
+            self.set_loading(False)
+        if self.loader is not None:
+            self.loader.cancel()
+            self.progress_bar.setFormat("Cancelling...")
+
+    def on_loading_progress(self, percent, stage):
+        self.progress_bar.setValue(percent)
+        self.progress_bar.setFormat(f"{stage}... %p%")
+
+    def on_session_loaded(self, data):
+        self.loader.wait()
+        self.loader = None
+        from main_window import MainWindow
+        self.main_window = MainWindow(data, self.main_dir)
+        self.main_window.show()
+        self.close()
 
-app = QApplication(sys.argv)
-folder_picker = FolderPickerApp()
-folder_picker.show()
-sys.exit(app.exec())
+    def on_loading_failed(self, message):
+        self.loader = None
+        self.set_loading(False)
+        self.warning_label.setText(f"Loading failed:\n{message}")
+
+    def on_loading_cancelled(self):
+        self.loader = None
+        self.set_loading(False)
+        self.warning_label.setText("Loading was cancelled.")
+
+    def closeEvent(self, event):
+        if self.loader is not None:
+            self.loader.cancel()
+            self.loader.wait()
+        self.module_loader.wait()
+        super().closeEvent(event)
+
+
+if __name__ == "__main__":
+    if "--import-times" in sys.argv:
+        print_import_times("main")
+        sys.exit()
+    if "--profile" in sys.argv:
+        # "--profile" may be followed by the trace path, otherwise the trace is written to PROFILE_TRACE_FILE.
+        idx = sys.argv.index("--profile")
+        has_path = idx + 1 < len(sys.argv) and not sys.argv[idx + 1].startswith("-")
+        profiler.enable(sys.argv.pop(idx + 1) if has_path else PROFILE_TRACE_FILE)
+        sys.argv.pop(idx)
+    app = QApplication(sys.argv)
+    folder_picker = FolderPickerApp()
+    folder_picker.show()
+    exit_code = app.exec()
+    if profiler.enabled and profiler.write_trace():
+        print(f"Trace written to '{profiler.trace_path}'.")
+    sys.exit(exit_code)
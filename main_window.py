@@ -0,0 +1,60 @@
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QTabWidget, QMainWindow
+
+from constants import *
+from graph_tab import GraphTab
+from table_tab import TableTab
+from event_response_tab import EventResponseTab
+from live_session import LiveDataClass
+from profiling import profiler
+
+
+class MainWindow(QMainWindow):
+    def __init__(self, data, main_dir):
+        super().__init__()
+
+        self.data = data
+
+        self.main_dir = main_dir
+
+        self.tabs = QTabWidget()
+        self.setCentralWidget(self.tabs)
+
+        self.graph_tab = GraphTab(data, main_dir)
+        self.table_tab = TableTab(data, main_dir)
+        self.event_response_tab = EventResponseTab(data)
+
+        self.tabs.addTab(self.graph_tab, "Graph")
+        self.tabs.addTab(self.table_tab, "Table")
+        self.tabs.addTab(self.event_response_tab, "HR response")
+
+        if profiler.enabled:
+            from diagnostics_panel import DiagnosticsPanel
+            self.diagnostics_panel = DiagnosticsPanel()
+            self.tabs.addTab(self.diagnostics_panel, "Diagnostics")
+
+        self.setWindowTitle("Eyetracking and heart rate data visualizer")
+        self.setGeometry(100, 100, 1200, 600)
+
+        self.tabs.currentChanged.connect(self.on_tab_changed)
+        self.on_tab_changed(0)
+
+        if isinstance(data, LiveDataClass):
+            self.refresh_timer = QTimer(self)
+            self.refresh_timer.timeout.connect(self.refresh_live_data)
+            self.refresh_timer.start(LIVE_REFRESH_INTERVAL_MS)
+            self.setWindowTitle(f"{self.windowTitle()} (live)")
+
+    def refresh_live_data(self):
+        if self.data.poll():
+            self.graph_tab.refresh_data()
+            self.table_tab.refresh_data()
+            self.event_response_tab.refresh_data()
+
+    def closeEvent(self, event):
+        self.graph_tab.stop_thumbnails()
+        super().closeEvent(event)
+
+    def on_tab_changed(self, index):
+        widget = self.tabs.widget(index)
+        widget.setFocus()
@@ -0,0 +1,66 @@
+from constants import *
+
+BATCH_ROWS = 65536
+
+
+class NoiseFilter:
+    def __init__(self, min_duration=NOISE_MIN_DURATION, noise_duration=NOISE_DURATION):
+        self.min_duration = min_duration
+        self.noise_duration = noise_duration
+        self.focused_record = None
+        self.noise_record = None
+
+    def push(self, record):
+        return self.push_rows((record,))
+
+    def push_rows(self, records):
+        min_duration, noise_duration = self.min_duration, self.noise_duration
+        focused_record, noise_record = self.focused_record, self.noise_record
+        try:
+            for record in records:
+                obj, tag, from_t, to_t = record
+                if focused_record is not None and focused_record[0] == obj:
+                    focused_record = (obj, tag, focused_record[2], to_t)
+                    noise_record = None
+                    continue
+
+                sum_sec = to_t - from_t
+                if sum_sec < min_duration:
+                    continue
+
+                if noise_record is not None:
+                    if noise_record[0] == obj:
+                        record = obj, tag, noise_record[2], to_t
+                    else:
+                        # Only the focused fixation can still be extended, so the previous one is final now.
+                        final_record, focused_record, noise_record = focused_record, noise_record, None
+                        if final_record is not None:
+                            yield final_record
+
+                if sum_sec < noise_duration:
+                    noise_record = record
+                else:
+                    final_record, focused_record = focused_record, record
+                    if final_record is not None:
+                        yield final_record
+        finally:
+            self.focused_record, self.noise_record = focused_record, noise_record
+
+    def push_batch(self, object_codes, tag_codes, from_s, to_s):
+        # Rows are converted to Python values a block at a time, so a large batch is never held as tuples.
+        for start in range(0, len(from_s), BATCH_ROWS):
+            block = slice(start, start + BATCH_ROWS)
+            yield from self.push_rows(zip(object_codes[block].tolist(), tag_codes[block].tolist(),
+                                          from_s[block].tolist(), to_s[block].tolist()))
+
+    def finish(self):
+        final_records = [record for record in (self.focused_record, self.noise_record) if record is not None]
+        self.focused_record = None
+        self.noise_record = None
+        return final_records
+
+
+def filter_noise(records, min_duration=NOISE_MIN_DURATION, noise_duration=NOISE_DURATION):
+    noise_filter = NoiseFilter(min_duration, noise_duration)
+    yield from noise_filter.push_rows(records)
+    yield from noise_filter.finish()
@@ -0,0 +1,110 @@
+import math
+from collections import deque
+from time import perf_counter
+
+import numpy
+from PyQt6.QtCore import QObject, QTimer, Qt, pyqtSignal
+
+from constants import *
+
+
+class Playback(QObject):
+    frame_changed = pyqtSignal(int)
+    state_changed = pyqtSignal(bool)
+
+    def __init__(self, times, parent=None):
+        super().__init__(parent)
+        self.times = times
+        self.speed = PLAYBACK_SPEEDS[0]
+        self.idx = 0
+        self.playing = False
+        self.anchor_x = 0.0
+        self.anchor_clock = 0.0
+
+        self.frame_clocks = deque()
+        self.shown_frames = 0
+        self.dropped_frames = 0
+
+        # Each tick is scheduled for the moment the next sample is due, not on a fixed interval.
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.advance)
+
+    def is_playing(self):
+        return self.playing
+
+    def set_times(self, times):
+        self.times = times
+
+    def set_speed(self, speed):
+        if not self.playing:
+            self.speed = speed
+            return
+        playback_x = self.get_playback_x()
+        self.speed = speed
+        self.anchor(playback_x)
+        self.schedule(playback_x)
+
+    def start(self, idx):
+        self.idx = idx
+        self.playing = True
+        self.frame_clocks.clear()
+        self.shown_frames = 0
+        self.dropped_frames = 0
+        self.state_changed.emit(True)
+        self.anchor(self.times[idx])
+        self.schedule(self.times[idx])
+
+    def stop(self):
+        if not self.playing:
+            return
+        self.playing = False
+        self.timer.stop()
+        self.state_changed.emit(False)
+
+    def seek(self, idx):
+        self.idx = idx
+        if self.playing:
+            self.anchor(self.times[idx])
+            self.schedule(self.times[idx])
+
+    def anchor(self, playback_x):
+        self.anchor_x = playback_x
+        self.anchor_clock = perf_counter()
+
+    def get_playback_x(self):
+        return self.anchor_x + (perf_counter() - self.anchor_clock) * self.speed
+
+    def schedule(self, playback_x):
+        if self.idx >= len(self.times) - 1:
+            self.stop()
+            return
+        delay_s = (self.times[self.idx + 1] - playback_x) / self.speed
+        self.timer.start(max(math.ceil(delay_s * 1000), 0))
+
+    def advance(self):
+        playback_x = self.get_playback_x()
+        idx = min(int(numpy.searchsorted(self.times, playback_x, side="right")) - 1, len(self.times) - 1)
+        if idx > self.idx:
+            # A late tick skips straight to the sample that is due, so playback never falls behind the clock.
+            self.dropped_frames += idx - self.idx - 1
+            self.idx = idx
+            self.record_frame()
+            self.frame_changed.emit(idx)
+        self.schedule(playback_x)
+
+    def record_frame(self):
+        clock = perf_counter()
+        self.shown_frames += 1
+        self.frame_clocks.append(clock)
+        while clock - self.frame_clocks[0] > PLAYBACK_FPS_WINDOW:
+            self.frame_clocks.popleft()
+
+    def add_dropped_frames(self, count):
+        self.dropped_frames += count
+
+    def get_fps(self):
+        if len(self.frame_clocks) < 2:
+            return 0.0
+        return (len(self.frame_clocks) - 1) / (self.frame_clocks[-1] - self.frame_clocks[0])
@@ -0,0 +1,161 @@
+import inspect
+import json
+import os
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from time import perf_counter
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from constants import *
+
+
+def get_peak_memory_bytes():
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[1]
+    return 0
+
+
+class SpanStats:
+    def __init__(self):
+        self.calls = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+
+    def add(self, seconds):
+        self.calls += 1
+        self.total_s += seconds
+        self.max_s = max(self.max_s, seconds)
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.trace_path = None
+        self.start_clock = perf_counter()
+        self.lock = threading.Lock()
+        self.events = list()
+        self.dropped_events = 0
+        self.stats = dict()
+        self.thread_names = dict()
+
+    def enable(self, trace_path=PROFILE_TRACE_FILE):
+        self.enabled = True
+        self.trace_path = trace_path
+        # Without getrusage the peak is taken from tracemalloc, which only sees Python allocations.
+        if resource is None and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def enable_from_environment(self):
+        trace_path = os.environ.get(PROFILE_ENV_VAR)
+        if trace_path:
+            self.enable(PROFILE_TRACE_FILE if trace_path == "1" else trace_path)
+
+    def span(self, name, category="app"):
+        if not self.enabled:
+            return nullcontext()
+        return self.record_span(name, category)
+
+    @contextmanager
+    def record_span(self, name, category):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, category, start, perf_counter())
+
+    def add_span(self, name, category, start, end):
+        thread = threading.current_thread()
+        with self.lock:
+            self.stats.setdefault(name, SpanStats()).add(end - start)
+            self.thread_names.setdefault(thread.ident, thread.name)
+            if len(self.events) >= PROFILE_MAX_EVENTS:
+                self.dropped_events += 1
+                return
+            self.events.append({"name": name, "cat": category, "ph": "X", "pid": os.getpid(), "tid": thread.ident,
+                                "ts": (start - self.start_clock) * 1e6, "dur": (end - start) * 1e6})
+            self.events.append({"name": "peak memory", "ph": "C", "pid": os.getpid(),
+                                "ts": (end - self.start_clock) * 1e6,
+                                "args": {"MB": round(get_peak_memory_bytes() / 1e6, 1)}})
+
+    @contextmanager
+    def stages(self, name, stage_names, report_stage):
+        # Wraps a report_stage callback so that every stage it reports becomes a span of its own.
+        if not self.enabled:
+            yield report_stage
+            return
+        current = {"stage": None, "start": None}
+
+        def close_stage():
+            if current["stage"] is not None:
+                self.add_span(f"{name}: {stage_names[current['stage']]}", "load", current["start"], perf_counter())
+                current["stage"] = None
+
+        def traced_report_stage(stage, fraction=0.0):
+            if stage != current["stage"]:
+                close_stage()
+                current["stage"], current["start"] = stage, perf_counter()
+            report_stage(stage, fraction)
+
+        with self.record_span(name, "load"):
+            try:
+                yield traced_report_stage
+            finally:
+                close_stage()
+
+    def get_summary(self):
+        with self.lock:
+            return [(name, stats.calls, stats.total_s, stats.max_s) for name, stats in self.stats.items()]
+
+    def write_trace(self, path=None):
+        path = self.trace_path if path is None else path
+        with self.lock:
+            metadata = [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": ident, "args": {"name": thread_name}}
+                        for ident, thread_name in self.thread_names.items()]
+            trace = {"traceEvents": metadata + self.events, "displayTimeUnit": "ms",
+                     "otherData": {"dropped_events": self.dropped_events,
+                                   "peak_memory_bytes": get_peak_memory_bytes()}}
+        try:
+            with open(path, 'w') as file:
+                json.dump(trace, file)
+        except OSError as error:
+            print(f"Trace '{path}' could not be written: {error}")
+            return False
+        return True
+
+
+def get_positional_count(function):
+    parameters = inspect.signature(function).parameters.values()
+    if any(parameter.kind == parameter.VAR_POSITIONAL for parameter in parameters):
+        return None
+    return sum(parameter.kind in (parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD) for parameter in parameters)
+
+
+def profiled(name, category="app"):
+    def decorator(function):
+        # PyQt passes every signal argument to a slot taking *args, like the "checked" flag of clicked,
+        # so the wrapper drops the ones the decorated function does not take.
+        positional_count = get_positional_count(function)
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            args = args[:positional_count]
+            if not profiler.enabled:
+                return function(*args, **kwargs)
+            with profiler.record_span(name, category):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+profiler = Profiler()
+profiler.enable_from_environment()
@@ -0,0 +1,150 @@
+from collections import OrderedDict
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, Qt, pyqtSignal
+from PyQt6.QtGui import QImage, QImageReader, QPixmap
+
+from constants import *
+from profiling import profiler
+
+
+def decode_screenshot(path, max_size=SCREENSHOT_MAX_SIZE):
+    reader = QImageReader(path)
+    size = reader.size()
+    max_width, max_height = max_size
+    if size.isValid() and (size.width() > max_width or size.height() > max_height):
+        reader.setScaledSize(size.scaled(max_width, max_height, Qt.AspectRatioMode.KeepAspectRatio))
+    return reader.read()
+
+
+def scale_screenshot(path, size):
+    # Large screenshots are decoded straight at the target size, only smaller ones are scaled up afterwards.
+    image = decode_screenshot(path, (size.width(), size.height()))
+    if image.width() < size.width() and image.height() < size.height():
+        image = image.scaled(size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+    return image
+
+
+def get_pixmap_bytes(pixmap):
+    return pixmap.width() * pixmap.height() * max(pixmap.depth(), 1) // 8
+
+
+class ScreenshotDecodeSignals(QObject):
+    decoded = pyqtSignal(object, QImage)
+
+
+class ScreenshotDecodeTask(QRunnable):
+    def __init__(self, key, path, max_size, signals):
+        super().__init__()
+        self.key = key
+        self.path = path
+        self.max_size = max_size
+        self.signals = signals
+
+    def run(self):
+        with profiler.span("ScreenshotCache: prefetch decode", "graph"):
+            image = decode_screenshot(self.path, self.max_size)
+        self.signals.decoded.emit(self.key, image)
+
+
+class ScreenshotScaleTask(QRunnable):
+    def __init__(self, key, path, size, signals):
+        super().__init__()
+        self.key = key
+        self.path = path
+        self.size = size
+        self.signals = signals
+
+    def run(self):
+        with profiler.span("ScreenshotScaler: decode and scale", "graph"):
+            image = scale_screenshot(self.path, self.size)
+        self.signals.decoded.emit(self.key, image)
+
+
+class ScreenshotScaler(QObject):
+    scaled = pyqtSignal(object, QImage)
+    dropped = pyqtSignal(int)
+
+    def __init__(self, get_image_path, parent=None):
+        super().__init__(parent)
+        self.get_image_path = get_image_path
+        self.busy = False
+        self.queued = None
+
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(1)
+        self.signals = ScreenshotDecodeSignals(self)
+        self.signals.decoded.connect(self.on_scaled)
+
+    def request(self, key, size):
+        # Only the newest request waits behind a running one, older ones are dropped.
+        if self.busy:
+            if self.queued is not None:
+                self.dropped.emit(1)
+            self.queued = key, size
+            return
+        self.busy = True
+        self.thread_pool.start(ScreenshotScaleTask(key, self.get_image_path(key), size, self.signals))
+
+    def on_scaled(self, key, image):
+        self.busy = False
+        self.scaled.emit(key, image)
+        if self.queued is not None:
+            queued, self.queued = self.queued, None
+            self.request(*queued)
+
+    def clear(self):
+        self.queued = None
+
+
+class ScreenshotCache(QObject):
+    def __init__(self, get_image_path, budget_bytes=SCREENSHOT_CACHE_BUDGET, max_size=SCREENSHOT_MAX_SIZE, parent=None):
+        super().__init__(parent)
+        self.get_image_path = get_image_path
+        self.budget_bytes = budget_bytes
+        self.max_size = max_size
+
+        self.pixmaps = OrderedDict()
+        self.used_bytes = 0
+        self.pending = set()
+
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(SCREENSHOT_DECODE_THREADS)
+        self.signals = ScreenshotDecodeSignals(self)
+        self.signals.decoded.connect(self.on_decoded)
+
+    def get(self, key):
+        pixmap = self.pixmaps.get(key)
+        if pixmap is not None:
+            self.pixmaps.move_to_end(key)
+            return pixmap
+        pixmap = QPixmap.fromImage(decode_screenshot(self.get_image_path(key), self.max_size))
+        self.insert(key, pixmap)
+        return pixmap
+
+    def prefetch(self, keys):
+        # Requests for screenshots the user has already stepped past are dropped.
+        self.thread_pool.clear()
+        self.pending.clear()
+        for key in keys:
+            if key in self.pixmaps or key in self.pending:
+                continue
+            self.pending.add(key)
+            self.thread_pool.start(ScreenshotDecodeTask(key, self.get_image_path(key), self.max_size, self.signals))
+
+    def on_decoded(self, key, image):
+        self.pending.discard(key)
+        if key not in self.pixmaps:
+            self.insert(key, QPixmap.fromImage(image))
+
+    def insert(self, key, pixmap):
+        self.pixmaps[key] = pixmap
+        self.used_bytes += get_pixmap_bytes(pixmap)
+        while self.used_bytes > self.budget_bytes and len(self.pixmaps) > 1:
+            _, evicted = self.pixmaps.popitem(last=False)
+            self.used_bytes -= get_pixmap_bytes(evicted)
+
+    def clear(self):
+        self.thread_pool.clear()
+        self.pending.clear()
+        self.pixmaps.clear()
+        self.used_bytes = 0
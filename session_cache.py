@@ -0,0 +1,42 @@
+import os
+import zipfile
+
+import numpy
+
+from constants import *
+
+
+def get_file_signature(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def get_session_signature(main_dir):
+    return numpy.array([SESSION_CACHE_VERSION, round(NOISE_MIN_DURATION * 1000000), round(NOISE_DURATION * 1000000)]
+                       + get_file_signature(main_dir.get_text_data_path())
+                       + get_file_signature(main_dir.get_hr_data_path())
+                       + get_file_signature(main_dir.get_image_dir_path()), dtype=numpy.int64)
+
+
+def load_session_cache(main_dir, signature):
+    path = main_dir.get_cache_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        with numpy.load(path, allow_pickle=False) as cache:
+            if not numpy.array_equal(cache["signature"], signature):
+                return None
+            return {key: cache[key] for key in cache.files}
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        return None
+
+
+def save_session_cache(main_dir, signature, arrays):
+    path = main_dir.get_cache_path()
+    temp_path = f"{path}.tmp"
+    try:
+        with open(temp_path, 'wb') as file:
+            numpy.savez(file, signature=signature, **arrays)
+        os.replace(temp_path, path)
+    except OSError as error:
+        print(f"Session cache '{path}' could not be saved: {error}")
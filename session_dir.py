@@ -0,0 +1,72 @@
+import json
+import os
+
+from constants import *
+
+
+class MainDirClass:
+    def __init__(self):
+        self.last_path = ""
+        self.folder = "data"
+        self.data_file_name = "data.csv"
+        self.images_dir_name = "images"
+        self.hr_data_file_name = "hr_data.csv"
+
+    def get_folder_path(self):
+        return os.path.join(self.last_path, self.folder)
+
+    def get_text_data_path(self):
+        return os.path.join(self.get_folder_path(), self.data_file_name)
+
+    def get_hr_data_path(self):
+        return os.path.join(self.get_folder_path(), self.hr_data_file_name)
+
+    def get_image_dir_path(self):
+        return os.path.join(self.get_folder_path(), self.images_dir_name)
+
+    def get_cache_path(self):
+        return os.path.join(self.get_folder_path(), SESSION_CACHE_FILE)
+
+    def get_thumbnail_dir_path(self):
+        return os.path.join(self.get_folder_path(), THUMBNAIL_DIR)
+
+    @classmethod
+    def from_path(cls, path):
+        main_dir = cls()
+        main_dir.change_dir_info(os.path.normpath(path))
+        return main_dir
+
+    def change_dir_info(self, path):
+        self.last_path = os.path.dirname(path)
+        self.folder = os.path.basename(path)
+
+    def load_last_path(self):
+        if os.path.exists(LAST_DIR_FILE):
+            with open(LAST_DIR_FILE, 'r') as file:
+                data = json.load(file)
+                self.last_path = data.get("last_path")
+                self.folder = data.get("folder")
+
+    def save_last_path(self):
+        with open(LAST_DIR_FILE, 'w') as file:
+            data = {"last_path": self.last_path, "folder": self.folder}
+            json.dump(data, file)
+
+
+def is_session_dir(path, main_dir=None):
+    if main_dir is None:
+        main_dir = MainDirClass()
+    return (os.path.isfile(os.path.join(path, main_dir.data_file_name)) and
+            os.path.isfile(os.path.join(path, main_dir.hr_data_file_name)) and
+            os.path.isdir(os.path.join(path, main_dir.images_dir_name)))
+
+
+def find_session_dirs(paths):
+    session_dirs = list()
+    for path in paths:
+        if is_session_dir(path):
+            session_dirs.append(path)
+        elif os.path.isdir(path):
+            sub_dirs = sorted(entry.path for entry in os.scandir(path) if entry.is_dir())
+            session_dirs.extend(find_session_dirs(sub_dirs))
+    return session_dirs
@@ -0,0 +1,39 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from constants import *
+from data_processing import DataClass
+
+
+class LoadingCancelled(Exception):
+    pass
+
+
+class SessionLoader(QThread):
+    progress = pyqtSignal(int, str)
+    loaded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, main_dir, parent=None):
+        super().__init__(parent)
+        self.main_dir = main_dir
+        self.cancel_requested = False
+
+    def cancel(self):
+        self.cancel_requested = True
+
+    def report_stage(self, stage, fraction=0.0):
+        if self.cancel_requested:
+            raise LoadingCancelled()
+        percent = int(100 * (stage + fraction) / len(LOADING_STAGES))
+        self.progress.emit(percent, LOADING_STAGES[stage])
+
+    def run(self):
+        try:
+            data = DataClass(self.main_dir, report_stage=self.report_stage)
+        except LoadingCancelled:
+            self.cancelled.emit()
+        except Exception as error:
+            self.failed.emit(str(error))
+        else:
+            self.loaded.emit(data)
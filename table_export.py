@@ -0,0 +1,23 @@
+import csv
+
+import numpy
+
+from constants import *
+
+
+def write_csv_table(path, table):
+    columns = table.get_columns()
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file, delimiter=DELIMITER)
+        writer.writerow(columns)
+        # Missing values (NaN) are written as empty fields.
+        rows = zip(*[column.tolist() for column in columns.values()])
+        writer.writerows(["" if value != value else value for value in row] for row in rows)
+
+
+def write_npz_table(path, table):
+    numpy.savez(path, **table.get_columns())
+
+
+def get_table_writer(file_format):
+    return write_csv_table if file_format == "csv" else write_npz_table
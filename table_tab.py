@@ -1,8 +1,210 @@
-from PyQt6.QtWidgets import (QWidget, QPushButton, QTableWidget,
-                             QTableWidgetItem, QComboBox, QGridLayout, QHeaderView, QLabel)
+import math
+
+import numpy
+from PyQt6.QtCore import Qt, QAbstractTableModel, QAbstractProxyModel, QModelIndex
+from PyQt6.QtGui import QColor, QFont, QFontMetrics
+from PyQt6.QtWidgets import (QWidget, QPushButton, QTableView, QStyledItemDelegate, QStyle, QApplication,
+                             QComboBox, QGridLayout, QHeaderView)
 
 from constants import *
 from basic_functions import *
+from fixation_table import create_empty_fixation_table
+from heart_rate import HeartRateBaseline
+from profiling import profiled
+
+# Table columns show min. HR before max. HR.
+COLUMN_FIELDS = ("object_codes", "tag_codes", "from_s", "to_s", "durations", "hr_avg", "hr_change", "hr_min", "hr_max",
+                 "hr_range", "view_counts")
+HR_CHANGE_COLUMN = 6
+HR_CHANGE_ROLE = Qt.ItemDataRole.UserRole
+
+
+class FixationTableModel(QAbstractTableModel):
+    def __init__(self, header, parent=None):
+        super().__init__(parent)
+        self.header = header
+        self.table = create_empty_fixation_table()
+        self.row_count = 0
+        self.sort_keys = dict()
+
+    def set_table(self, table):
+        self.beginResetModel()
+        self.table = table
+        self.row_count = len(table)
+        self.sort_keys = dict()
+        self.endResetModel()
+
+    def append_rows(self):
+        if len(self.table) == self.row_count:
+            return
+        self.beginInsertRows(QModelIndex(), self.row_count, len(self.table) - 1)
+        self.row_count = len(self.table)
+        self.sort_keys = dict()
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.header)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.header[section]
+        return super().headerData(section, orientation, role)
+
+    def get_column(self, column):
+        return getattr(self.table, COLUMN_FIELDS[column])
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        value = self.get_column(index.column())[index.row()].item()
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.format_value(index.column(), value)
+        if role == HR_CHANGE_ROLE and index.column() == HR_CHANGE_COLUMN:
+            return None if math.isnan(value) else int(value)
+        return None
+
+    def format_value(self, column, value):
+        if column in (0, 1):
+            name = self.table.get_name(value)
+            return "-" if name is None else name
+        if column in (2, 3):
+            return "-" if math.isnan(value) else formate_time(sec_to_time(value))
+        if column == 4:
+            return formate_time(sec_to_time(value))
+        if column == 5:
+            return "N/A" if math.isnan(value) or value == 0 else str(int(value))
+        if column == HR_CHANGE_COLUMN:
+            if math.isnan(value):
+                return "N/A"
+            return f"{'↓' if int(value) <= 0 else '↑'} {int(value)}"
+        if column == 10:
+            return str(value)
+        return "N/A" if math.isnan(value) else str(int(value))
+
+    def get_sort_keys(self, column):
+        if column not in self.sort_keys:
+            values = self.get_column(column)
+            if column in (0, 1):
+                self.sort_keys[column] = self.table.get_names(values)
+            elif column == 5:
+                self.sort_keys[column] = numpy.where(values == 0, math.nan, values)
+            else:
+                self.sort_keys[column] = values.astype(float)
+        return self.sort_keys[column]
+
+
+class ColumnSortProxyModel(QAbstractProxyModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.order = None
+        self.inverse = None
+        self.sort_column = -1
+        self.sort_order = Qt.SortOrder.AscendingOrder
+
+    def setSourceModel(self, model):
+        super().setSourceModel(model)
+        model.modelAboutToBeReset.connect(self.beginResetModel)
+        model.modelReset.connect(self.on_source_reset)
+        model.rowsAboutToBeInserted.connect(self.on_source_rows_about_to_be_inserted)
+        model.rowsInserted.connect(self.on_source_rows_inserted)
+
+    def on_source_reset(self):
+        self.order = None
+        self.inverse = None
+        self.endResetModel()
+
+    def on_source_rows_about_to_be_inserted(self, parent, first, last):
+        self.beginInsertRows(QModelIndex(), first, last)
+
+    def on_source_rows_inserted(self, parent, first, last):
+        # Rows are only appended, so they first show up at the end and are then sorted in.
+        if self.order is not None:
+            new_rows = numpy.arange(first, last + 1)
+            self.order = numpy.concatenate((self.order, new_rows))
+            self.inverse = numpy.concatenate((self.inverse, new_rows))
+        self.endInsertRows()
+        if self.order is not None:
+            self.sort(self.sort_column, self.sort_order)
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index):
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.sourceModel().rowCount()
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.sourceModel().columnCount()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QModelIndex()
+        row = proxy_index.row() if self.order is None else int(self.order[proxy_index.row()])
+        return self.sourceModel().index(row, proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        row = source_index.row() if self.inverse is None else int(self.inverse[source_index.row()])
+        return self.index(row, source_index.column())
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        source_indexes = [self.mapToSource(index) for index in persistent]
+        self.sort_column = column
+        self.sort_order = order
+
+        if column < 0:
+            self.order = None
+            self.inverse = None
+        else:
+            self.order = numpy.argsort(self.sourceModel().get_sort_keys(column), kind="stable")
+            if order == Qt.SortOrder.DescendingOrder:
+                self.order = self.order[::-1]
+            self.inverse = numpy.empty_like(self.order)
+            self.inverse[self.order] = numpy.arange(len(self.order))
+
+        self.changePersistentIndexList(persistent, [self.mapFromSource(index) for index in source_indexes])
+        self.layoutChanged.emit()
+
+
+class HrChangeDelegate(QStyledItemDelegate):
+    def paint(self, painter, option, index):
+        hr_change = index.data(HR_CHANGE_ROLE)
+        if hr_change is None:
+            super().paint(painter, option, index)
+            return
+
+        self.initStyleOption(option, index)
+        option.text = ""
+        style = option.widget.style() if option.widget is not None else QApplication.style()
+        style.drawControl(QStyle.ControlElement.CE_ItemViewItem, option, painter, option.widget)
+
+        arrow = "↓" if hr_change <= 0 else "↑"
+        arrow_font = QFont(option.font)
+        arrow_font.setPixelSize(18)
+        rect = option.rect.adjusted(2, 0, 0, 0)
+        alignment = Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter
+
+        painter.save()
+        painter.setFont(arrow_font)
+        painter.setPen(QColor("green" if hr_change <= 0 else "red"))
+        painter.drawText(rect, alignment, arrow)
+        rect.setLeft(rect.left() + QFontMetrics(arrow_font).horizontalAdvance(f"{arrow} "))
+        painter.setFont(option.font)
+        painter.setPen(option.palette.color(option.palette.ColorRole.HighlightedText
+                                            if option.state & QStyle.StateFlag.State_Selected
+                                            else option.palette.ColorRole.Text))
+        painter.drawText(rect, alignment, str(hr_change))
+        painter.restore()
 
 
 class TableTab(QWidget):
@@ -14,6 +216,7 @@ class TableTab(QWidget):
 
         self.data = data
         self.main_dir = main_dir
+        self.filter_id = 0
 
         self.layout = QGridLayout()
 
@@ -21,8 +224,6 @@ class TableTab(QWidget):
 
     def setup_table_tab(self):
         self.table = self.setup_table()
-        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        self.table.setSortingEnabled(True)
         self.fill_table_with_data(self.data.object_data)
 
         self.filter_dropdown = QComboBox()
@@ -34,128 +235,71 @@ class TableTab(QWidget):
         self.filter_button.clicked.connect(self.apply_filter)
         self.layout.addWidget(self.filter_button, 0, 1)
 
-        self.layout.addWidget(self.table, 1, 0, 1, 2)
+        self.baseline_dropdown = QComboBox()
+        self.baseline_dropdown.addItems([f"ΔHR baseline: {name}" for name in HR_BASELINE_NAMES])
+        self.baseline_dropdown.setCurrentIndex(HR_BASELINE_METHODS.index(self.data.hr_baseline_method.method))
+        self.baseline_dropdown.currentIndexChanged.connect(self.change_baseline)
+        self.layout.addWidget(self.baseline_dropdown, 0, 2)
+
+        self.layout.addWidget(self.table, 1, 0, 1, 3)
 
         self.setLayout(self.layout)
 
     def setup_table(self):
-        table = QTableWidget()
-        table.setColumnCount(len(self.table_header))
+        self.table_model = FixationTableModel(self.table_header, self)
+        self.sort_model = ColumnSortProxyModel(self)
+        self.sort_model.setSourceModel(self.table_model)
 
-        table.setHorizontalHeaderLabels(self.table_header)
+        table = QTableView()
+        table.setModel(self.sort_model)
+        table.setItemDelegateForColumn(HR_CHANGE_COLUMN, HrChangeDelegate(table))
+        table.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
 
         header = table.horizontalHeader()
-        for col in range(table.columnCount()):
+        for col in range(self.table_model.columnCount()):
             header.setSectionResizeMode(col, QHeaderView.ResizeMode.Stretch)
 
+        table.setSortingEnabled(True)
+        header.setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
         return table
 
-    def create_formatted_record(self, record):
-        if len(record) != len(self.table_header):
-            record = [None] * len(self.table_header)
-        obj, tag, from_t, to_t, sum_t, hr, hr_change, hr_max, hr_min, hr_range, view_count = record
-        obj_s = "-" if obj is None else obj
-        tag_s = "-" if tag is None else tag
-        from_s = "-" if from_t is None or not isinstance(from_t, time) else formate_time(from_t)
-        to_s = "-" if to_t is None or not isinstance(to_t, time) else formate_time(to_t)
-        sec = sum_t
-        if sum_t is None or not isinstance(sum_t, float):
-            sec = 0
-        sum_s = formate_time(sec_to_time(sec))
-        hr_s = "N/A" if hr is None or hr == 0 else str(int(hr))
-
-        if hr_change is None:
-            hr_change_s = "N/A"
-        else:
-            hr_change = int(hr_change)
-            arrow = "↓" if hr_change <= 0 else "↑"
-            color = "green" if hr_change <= 0 else "red"
-
-            hr_change_s = f'<span style="color:{color}; font-size:18px">{arrow}</span> {str(int(hr_change))}'
-
-        hr_change_label = QLabel()
-        hr_change_label.setText(hr_change_s)
-        hr_change_label.setStyleSheet("margin-left:2px;")
-
-        hr_max_s = "N/A" if hr_max is None or not isinstance(hr_max, int) else str(hr_max)
-        hr_min_s = "N/A" if hr_min is None or not isinstance(hr_min, int) else str(hr_min)
-        hr_range_s = "N/A" if hr_range is None or not isinstance(hr_range, int) else str(hr_range)
-        view_count_s = "-" if view_count is None or not isinstance(view_count, int) else str(view_count)
-
-        return obj_s, tag_s, from_s, to_s, sum_s, hr_s, hr_change_label, hr_min_s, hr_max_s, hr_range_s, view_count_s
-
+    @profiled("TableTab.fill_table_with_data", "table")
     def fill_table_with_data(self, data):
-        self.table.sortItems(-1)
-        self.table.setSortingEnabled(False)
-
-        self.table.clearContents()
-        self.table.setRowCount(len(data))
-        for row, record in enumerate(data):
-            formatted_record = self.create_formatted_record(record)
-
-            for i, table_item in enumerate(formatted_record):
-                if i == 6:
-                    self.table.setCellWidget(row, i, table_item)
-                else:
-                    self.table.setItem(row, i, QTableWidgetItem(table_item))
-
-        self.table.setSortingEnabled(True)
-
-    @staticmethod
-    def average_data_ignoring_zeros(data1, time1, data2, time2):
-        if data1 is None:
-            return data2
-        if data2 is None:
-            return data1
-        return ((data1 * time1) + (data2 * time2)) / (time1 + time2)
-
-    def combine_data(self, record1, record2):
-        obj, tag, _, _, sum_t, hr, hr_change, hr_max, hr_min, hr_range, view_count = record1
-        _, _, _, _, sum_t2, hr2, hr_change2, hr_max2, hr_min2, hr_range2, view_count2 = record2
-        total_sec = sum_t + sum_t2
-        hr_avg = self.average_data_ignoring_zeros(hr, sum_t, hr2, sum_t2)
-        hr_change_avg = self.average_data_ignoring_zeros(hr_change, sum_t, hr_change2, sum_t2)
-        hr_max_total = custom_max(hr_max, hr_max2)
-        hr_min_total = custom_min(hr_min, hr_min2)
-        hr_range_total = None if hr_max_total is None or hr_min_total is None else hr_max_total - hr_min_total
-        view_count_total = view_count + view_count2
-        return [obj, tag, None, None, total_sec, hr_avg, hr_change_avg, hr_max_total, hr_min_total, hr_range_total, view_count_total]
-
-    def apply_filter(self):
-        filter_id = self.filter_dropdown.currentIndex()
-
-        filtered_data = list()
-        data = self.data.object_data
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.table_model.set_table(data)
 
+    def get_filtered_data(self, filter_id):
         # All
         if filter_id == 0:
-            filtered_data = data[:]
+            return self.data.object_data
         # Objects
         elif filter_id == 1:
-            data_dict = dict()
-            for record in data:
-                obj = record[0]
-                if data_dict.get(obj) is None:
-                    new_record = list(record)
-                    new_record[2:4] = [None, None]
-                    data_dict[obj] = new_record
-                else:
-                    data_dict[obj] = self.combine_data(record, data_dict[obj])
-            filtered_data = list(data_dict.values())
+            return self.data.get_aggregated_data("object")
         # Tags
-        elif filter_id == 2:
-            data_dict = dict()
-            for record in data:
-                tag = record[1]
-                if data_dict.get(tag) is None:
-                    new_record = list(record)
-                    new_record[0] = None
-                    new_record[2:4] = [None, None]
-                    data_dict[tag] = new_record
-                else:
-                    combined_data = self.combine_data(record, data_dict[tag])
-                    combined_data[0] = None
-                    data_dict[tag] = combined_data
-            filtered_data = list(data_dict.values())
-
-        self.fill_table_with_data(filtered_data)
+        else:
+            return self.data.get_aggregated_data("tag")
+
+    @profiled("TableTab.apply_filter", "table")
+    def apply_filter(self):
+        self.filter_id = self.filter_dropdown.currentIndex()
+        self.fill_table_with_data(self.get_filtered_data(self.filter_id))
+
+    @profiled("TableTab.change_baseline", "table")
+    def change_baseline(self, index):
+        self.data.set_hr_baseline_method(HeartRateBaseline(HR_BASELINE_METHODS[index]))
+        self.reload_table()
+
+    @profiled("TableTab.refresh_data", "table")
+    def refresh_data(self):
+        # A live session replaces its fixations when their HR or ΔHR change, otherwise rows are only added.
+        if self.filter_id == 0 and self.table_model.table is self.data.object_data:
+            self.table_model.append_rows()
+            return
+        self.reload_table()
+
+    def reload_table(self):
+        # Keeps the sort order chosen by the user.
+        header = self.table.horizontalHeader()
+        self.table_model.set_table(self.get_filtered_data(self.filter_id))
+        if header.sortIndicatorSection() >= 0:
+            self.sort_model.sort(header.sortIndicatorSection(), header.sortIndicatorOrder())
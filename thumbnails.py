@@ -0,0 +1,188 @@
+import glob
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
+
+import numpy
+from PyQt6.QtCore import Qt, QBuffer, QByteArray, QIODevice
+
+from constants import *
+from image_index import get_image_name
+from screenshot_cache import decode_screenshot
+
+
+def encode_jpeg(image):
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    image.save(buffer, "JPEG", THUMBNAIL_QUALITY)
+    return bytes(data)
+
+
+def create_thumbnails(path):
+    # The largest level is decoded straight at its size, smaller levels are scaled down from it.
+    image = decode_screenshot(path, (THUMBNAIL_HEIGHTS[0] * 4, THUMBNAIL_HEIGHTS[0]))
+    if image.isNull():
+        return None
+    thumbnails = list()
+    for height in THUMBNAIL_HEIGHTS:
+        if image.height() > height:
+            image = image.scaledToHeight(height, Qt.TransformationMode.SmoothTransformation)
+        thumbnails.append(encode_jpeg(image))
+    return thumbnails
+
+
+def create_thumbnail_chunk(image_dir, capture_times):
+    results = list()
+    for capture_time in capture_times:
+        path = os.path.join(image_dir, f"{get_image_name(capture_time)}{FILE_EXTENSION}")
+        results.append((capture_time, create_thumbnails(path)))
+    return results
+
+
+class ThumbnailStore:
+    # One append-only pack file of JPEG thumbnails per pyramid level, and an index of where each one is.
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.pack_paths = [os.path.join(path, f"thumbnails_{height}.bin") for height in THUMBNAIL_HEIGHTS]
+        self.index_path = os.path.join(path, THUMBNAIL_INDEX_FILE)
+        self.capture_times = numpy.array([], dtype=numpy.int64)
+        self.offsets = numpy.empty((len(THUMBNAIL_HEIGHTS), 0), dtype=numpy.int64)
+        self.lengths = numpy.empty((len(THUMBNAIL_HEIGHTS), 0), dtype=numpy.int64)
+        self.failed = set()
+        self.readers = None
+        self.load_index()
+
+    def __len__(self):
+        return len(self.capture_times)
+
+    def load_index(self):
+        # Thumbnails written after the index was last saved are simply built again.
+        try:
+            with numpy.load(self.index_path, allow_pickle=False) as index:
+                if (index["version"].item() == THUMBNAIL_FORMAT_VERSION
+                        and numpy.array_equal(index["heights"], THUMBNAIL_HEIGHTS)):
+                    capture_times, offsets, lengths = index["capture_times"], index["offsets"], index["lengths"]
+                    pack_sizes = [os.path.getsize(path) if os.path.exists(path) else 0 for path in self.pack_paths]
+                    if not len(capture_times) or numpy.all((offsets + lengths).max(axis=1) <= pack_sizes):
+                        self.capture_times, self.offsets, self.lengths = capture_times, offsets, lengths
+                        return
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            pass
+        self.remove_packs()
+
+    def remove_packs(self):
+        # Pack files without a matching index cannot be read, so they are started again. Packs of levels that
+        # are no longer built are removed as well.
+        for path in glob.glob(os.path.join(self.path, "thumbnails_*.bin")):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as error:
+                print(f"Thumbnails '{path}' could not be removed: {error}")
+
+    def save_index(self):
+        os.makedirs(self.path, exist_ok=True)
+        temp_path = f"{self.index_path}.tmp"
+        with self.lock:
+            arrays = {"capture_times": self.capture_times, "offsets": self.offsets, "lengths": self.lengths}
+        try:
+            with open(temp_path, 'wb') as file:
+                numpy.savez(file, version=THUMBNAIL_FORMAT_VERSION, heights=THUMBNAIL_HEIGHTS, **arrays)
+            os.replace(temp_path, self.index_path)
+        except OSError as error:
+            print(f"Thumbnail index '{self.index_path}' could not be saved: {error}")
+
+    def get_missing(self, capture_times):
+        capture_times = numpy.unique(numpy.asarray(capture_times, dtype=numpy.int64) % DAY_SECONDS)
+        missing = capture_times[~numpy.isin(capture_times, self.capture_times)]
+        return [capture_time for capture_time in missing.tolist() if capture_time not in self.failed]
+
+    def add(self, results):
+        # Unreadable screenshots are not tried again until the session is reopened.
+        self.failed.update(capture_time for capture_time, thumbnails in results if thumbnails is None)
+        results = [(capture_time, thumbnails) for capture_time, thumbnails in results if thumbnails is not None]
+        if not results:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        offsets = numpy.empty((len(THUMBNAIL_HEIGHTS), len(results)), dtype=numpy.int64)
+        lengths = numpy.empty_like(offsets)
+        for level, pack_path in enumerate(self.pack_paths):
+            with open(pack_path, 'ab') as file:
+                offset = file.tell()
+                for column, (capture_time, thumbnails) in enumerate(results):
+                    file.write(thumbnails[level])
+                    offsets[level, column] = offset
+                    lengths[level, column] = len(thumbnails[level])
+                    offset += len(thumbnails[level])
+
+        new_times = numpy.array([capture_time for capture_time, thumbnails in results], dtype=numpy.int64)
+        capture_times = numpy.concatenate((self.capture_times, new_times))
+        order = numpy.argsort(capture_times, kind="stable")
+        with self.lock:
+            self.capture_times = capture_times[order]
+            self.offsets = numpy.concatenate((self.offsets, offsets), axis=1)[:, order]
+            self.lengths = numpy.concatenate((self.lengths, lengths), axis=1)[:, order]
+
+    def get(self, capture_time, level):
+        capture_time %= DAY_SECONDS
+        with self.lock:
+            idx = numpy.searchsorted(self.capture_times, capture_time)
+            if idx == len(self.capture_times) or self.capture_times[idx] != capture_time:
+                return None
+            offset, length = self.offsets[level, idx].item(), self.lengths[level, idx].item()
+            if self.readers is None:
+                self.readers = [None] * len(self.pack_paths)
+            if self.readers[level] is None:
+                self.readers[level] = open(self.pack_paths[level], 'rb')
+            reader = self.readers[level]
+            reader.seek(offset)
+            return reader.read(length)
+
+    def close(self):
+        with self.lock:
+            for reader in self.readers or ():
+                if reader is not None:
+                    reader.close()
+            self.readers = None
+
+
+def build_thumbnails(store, image_dir, capture_times, workers=None, on_progress=None, is_cancelled=None):
+    # Only screenshots without thumbnails are decoded, in worker processes, and the index is saved now and then,
+    # so an interrupted build continues where it stopped.
+    missing = store.get_missing(capture_times)
+    if not missing:
+        return 0
+    chunks = [missing[i:i + THUMBNAIL_CHUNK_SIZE] for i in range(0, len(missing), THUMBNAIL_CHUNK_SIZE)]
+    if len(chunks) == 1:
+        # A few new screenshots, as in a live session, are not worth starting worker processes for.
+        store.add(create_thumbnail_chunk(image_dir, missing))
+        store.save_index()
+        if on_progress is not None:
+            on_progress(len(missing), len(missing))
+        return len(missing)
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    built = 0
+    last_save = perf_counter()
+    try:
+        futures = [executor.submit(create_thumbnail_chunk, image_dir, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            results = future.result()
+            store.add(results)
+            built += len(results)
+            if perf_counter() - last_save > THUMBNAIL_SAVE_INTERVAL:
+                store.save_index()
+                last_save = perf_counter()
+            if on_progress is not None:
+                on_progress(built, len(missing))
+            if is_cancelled is not None and is_cancelled():
+                break
+    finally:
+        executor.shutdown(cancel_futures=True)
+        store.save_index()
+    return built
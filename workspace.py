@@ -0,0 +1,81 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy
+
+from constants import *
+from session_dir import MainDirClass
+from data_processing import DataClass
+from event_response import compute_event_response, get_event_offsets
+
+COMPARISON_METRICS = ("durations", "hr_avg", "hr_change", "view_counts")
+
+
+def load_session(session_dir):
+    return DataClass(MainDirClass.from_path(session_dir))
+
+
+def iter_loaded_sessions(session_dirs, workers=None):
+    # Spawned workers never inherit the GUI's threads, and they import nothing from Qt.
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        futures = {executor.submit(load_session, session_dir): session_dir for session_dir in session_dirs}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+class ComparisonTable:
+    def __init__(self, labels, session_names, metrics):
+        self.labels = labels
+        self.session_names = session_names
+        # metrics[metric] has one row per label and one column per session, NaN where a session lacks the label.
+        self.metrics = metrics
+
+    def __len__(self):
+        return len(self.labels)
+
+
+class Workspace:
+    def __init__(self, session_dirs, sessions):
+        self.session_dirs = list(session_dirs)
+        self.sessions = list(sessions)
+        root = os.path.commonpath([os.path.abspath(path) for path in self.session_dirs])
+        if len(self.session_dirs) == 1:
+            root = os.path.dirname(root)
+        self.session_names = [os.path.relpath(os.path.abspath(path), root) for path in self.session_dirs]
+        self.comparisons = dict()
+        self.event_responses = dict()
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def get_comparison(self, group_by):
+        if group_by not in self.comparisons:
+            self.comparisons[group_by] = self.create_comparison(group_by)
+        return self.comparisons[group_by]
+
+    def get_event_response(self, group_by, relative=False, window=EVENT_WINDOW):
+        key = group_by, relative, window
+        if key not in self.event_responses:
+            self.event_responses[key] = compute_event_response(self.sessions, group_by, get_event_offsets(*window),
+                                                               relative)
+        return self.event_responses[key]
+
+    def create_comparison(self, group_by):
+        tables = [data.get_aggregated_data(group_by) for data in self.sessions]
+        session_labels = [table.get_objects() if group_by == "object" else table.get_tags() for table in tables]
+
+        label_rows = dict()
+        for labels in session_labels:
+            for label in labels.tolist():
+                label_rows.setdefault(label, len(label_rows))
+
+        metrics = {metric: numpy.full((len(label_rows), len(tables)), numpy.nan) for metric in COMPARISON_METRICS}
+        for column, (table, labels) in enumerate(zip(tables, session_labels)):
+            rows = numpy.array([label_rows[label] for label in labels.tolist()], dtype=numpy.int64)
+            for metric in COMPARISON_METRICS:
+                metrics[metric][rows, column] = getattr(table, metric)
+        return ComparisonTable(list(label_rows), self.session_names, metrics)
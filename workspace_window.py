@@ -0,0 +1,225 @@
+import math
+
+import numpy
+import pyqtgraph
+from PyQt6.QtCore import Qt, QThread, QAbstractTableModel, QModelIndex, pyqtSignal
+from PyQt6.QtWidgets import (QWidget, QMainWindow, QTabWidget, QVBoxLayout, QHBoxLayout, QComboBox, QTableView,
+                             QHeaderView, QScrollArea, QStackedWidget)
+
+from constants import *
+from basic_functions import *
+from decimation import MinMaxPyramid
+from graph_tab import TimeAxisItem
+from table_tab import ColumnSortProxyModel
+from event_response_tab import EventResponseTab
+from workspace import *
+
+COMPARISON_HEADERS = ("Time", "HR (avg.)", "ΔHR", "views")
+SMALL_MULTIPLE_HEIGHT = 160
+
+
+class WorkspaceLoader(QThread):
+    progress = pyqtSignal(int, int)
+    loaded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, session_dirs, parent=None):
+        super().__init__(parent)
+        self.session_dirs = session_dirs
+        self.cancel_requested = False
+
+    def cancel(self):
+        self.cancel_requested = True
+
+    def run(self):
+        sessions = dict()
+        try:
+            for session_dir, data in iter_loaded_sessions(self.session_dirs):
+                if self.cancel_requested:
+                    self.cancelled.emit()
+                    return
+                sessions[session_dir] = data
+                self.progress.emit(len(sessions), len(self.session_dirs))
+        except Exception as error:
+            self.failed.emit(str(error))
+            return
+        self.loaded.emit(Workspace(self.session_dirs, [sessions[session_dir] for session_dir in self.session_dirs]))
+
+
+class ComparisonTableModel(QAbstractTableModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.table = None
+        self.label_header = ""
+
+    def set_table(self, table, label_header):
+        self.beginResetModel()
+        self.table = table
+        self.label_header = label_header
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() or self.table is None else len(self.table)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.table is None:
+            return 0
+        return 1 + len(self.table.session_names) * len(COMPARISON_METRICS)
+
+    def get_metric(self, column):
+        return divmod(column - 1, len(COMPARISON_METRICS))
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation != Qt.Orientation.Horizontal or role != Qt.ItemDataRole.DisplayRole:
+            return super().headerData(section, orientation, role)
+        if section == 0:
+            return self.label_header
+        session, metric = self.get_metric(section)
+        return f"{self.table.session_names[session]}\n{COMPARISON_HEADERS[metric]}"
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if index.column() == 0:
+            return self.table.labels[index.row()]
+        session, metric = self.get_metric(index.column())
+        if math.isnan(self.table.metrics["view_counts"][index.row(), session]):
+            return "-"
+        value = self.table.metrics[COMPARISON_METRICS[metric]][index.row(), session].item()
+        if metric == 0:
+            return formate_time(sec_to_time(value))
+        if math.isnan(value):
+            return "N/A"
+        if metric == 2:
+            return f"{'↓' if int(value) <= 0 else '↑'} {int(value)}"
+        return str(int(value))
+
+    def get_sort_keys(self, column):
+        if column == 0:
+            return numpy.array(self.table.labels, dtype=str)
+        session, metric = self.get_metric(column)
+        return self.table.metrics[COMPARISON_METRICS[metric]][:, session]
+
+
+class HeartRateComparisonTab(QWidget):
+    def __init__(self, workspace):
+        super().__init__()
+        self.workspace = workspace
+        self.pyramids = [MinMaxPyramid(data.hr_series.times, data.hr_series.values) for data in workspace.sessions]
+        self.colors = [pyqtgraph.intColor(i, hues=max(len(workspace), 1)) for i in range(len(workspace))]
+        self.end_s = max((data.hr_series.times[-1] for data in workspace.sessions if data.hr_series.size), default=60)
+
+        self.mode_dropdown = QComboBox()
+        self.mode_dropdown.addItems(("Overlay", "Small multiples"))
+        self.mode_dropdown.currentIndexChanged.connect(self.change_mode)
+
+        self.stack = QStackedWidget()
+        self.stack.addWidget(self.create_overlay())
+        self.stack.addWidget(self.create_small_multiples())
+
+        controls = QHBoxLayout()
+        controls.addWidget(self.mode_dropdown)
+        controls.addStretch()
+        layout = QVBoxLayout(self)
+        layout.addLayout(controls)
+        layout.addWidget(self.stack)
+
+    def create_plot(self):
+        plot = pyqtgraph.PlotWidget(axisItems={'bottom': TimeAxisItem(orientation="bottom")})
+        plot.hideButtons()
+        plot.setBackground('w')
+        plot.setYRange(0, 130)
+        plot.setMouseEnabled(x=True, y=False)
+        return plot
+
+    def create_overlay(self):
+        plot = self.create_plot()
+        plot.addLegend()
+        curves = [plot.plot(pen=pyqtgraph.mkPen(color=color, width=2), name=name)
+                  for color, name in zip(self.colors, self.workspace.session_names)]
+        sessions = list(range(len(self.workspace)))
+        plot.getViewBox().sigXRangeChanged.connect(lambda *args: self.update_curves(plot, curves, sessions))
+        plot.setXRange(0, self.end_s)
+        self.update_curves(plot, curves, sessions)
+        return plot
+
+    def create_small_multiples(self):
+        container = QWidget()
+        layout = QVBoxLayout(container)
+        first_plot = None
+        for session, (color, name) in enumerate(zip(self.colors, self.workspace.session_names)):
+            plot = self.create_plot()
+            plot.setTitle(name)
+            plot.setFixedHeight(SMALL_MULTIPLE_HEIGHT)
+            curve = plot.plot(pen=pyqtgraph.mkPen(color=color, width=2))
+            plot.getViewBox().sigXRangeChanged.connect(
+                lambda *args, plot=plot, curve=curve, session=session: self.update_curves(plot, [curve], [session]))
+            if first_plot is None:
+                first_plot = plot
+                plot.setXRange(0, self.end_s)
+            else:
+                plot.setXLink(first_plot)
+            self.update_curves(plot, [curve], [session])
+            layout.addWidget(plot)
+
+        scroll_area = QScrollArea()
+        scroll_area.setWidgetResizable(True)
+        scroll_area.setWidget(container)
+        return scroll_area
+
+    def update_curves(self, plot, curves, sessions):
+        view_box = plot.getViewBox()
+        x_from, x_to = view_box.viewRange()[0]
+        for curve, session in zip(curves, sessions):
+            xs, ys = self.pyramids[session].get_points(x_from, x_to, max(int(view_box.width()), 1))
+            curve.setData(xs, ys, connect="finite")
+
+    def change_mode(self, index):
+        self.stack.setCurrentIndex(index)
+
+
+class ComparisonTableTab(QWidget):
+    def __init__(self, workspace):
+        super().__init__()
+        self.workspace = workspace
+        self.group_options = (("Objects", "object", "Object"), ("Tags", "tag", "Tag"))
+
+        self.group_dropdown = QComboBox()
+        self.group_dropdown.addItems([option[0] for option in self.group_options])
+        self.group_dropdown.currentIndexChanged.connect(self.show_group)
+
+        self.table_model = ComparisonTableModel(self)
+        self.sort_model = ColumnSortProxyModel(self)
+        self.sort_model.setSourceModel(self.table_model)
+        self.table = QTableView()
+        self.table.setModel(self.sort_model)
+        self.table.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.show_group(0)
+        self.table.setSortingEnabled(True)
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.group_dropdown)
+        layout.addWidget(self.table)
+
+    def show_group(self, index):
+        _, group_by, label_header = self.group_options[index]
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.table_model.set_table(self.workspace.get_comparison(group_by), label_header)
+
+
+class WorkspaceWindow(QMainWindow):
+    def __init__(self, workspace):
+        super().__init__()
+        self.workspace = workspace
+
+        self.tabs = QTabWidget()
+        self.setCentralWidget(self.tabs)
+        self.tabs.addTab(HeartRateComparisonTab(workspace), "Heart rate")
+        self.tabs.addTab(ComparisonTableTab(workspace), "Comparison")
+        self.tabs.addTab(EventResponseTab(workspace), "HR response")
+
+        self.setWindowTitle(f"Session comparison ({len(workspace)} sessions)")
+        self.setGeometry(100, 100, 1200, 600)